@@ -0,0 +1,125 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from config import (MODEL_PATH, EXPORT_DIR, VIDEO_FRAME_STRIDE, VIDEO_CHUNK_SECONDS,
+                    VIDEO_SEEK_THRESHOLD, VIDEO_WORKER_THREADS)
+from utils.data_processor import computeRates
+from utils.exporter import writeCsv
+from utils.session_store import SESSION_DTYPE
+
+_detector = None
+
+
+def _initWorker(threads):
+    # 每个进程只用少量线程推理，避免多进程之间抢占CPU
+    global _detector
+    from detection.backends import loadModel
+    from detection.yolo_detector import YOLODetector
+    _detector = YOLODetector(MODEL_PATH, model=loadModel(MODEL_PATH, threads=threads))
+
+
+def _skipFrames(cap, count, nextIndex, seekThreshold=VIDEO_SEEK_THRESHOLD):
+    # FFmpeg后端的grab()仍会解码，只省去转换为BGR图像的开销；
+    # 定位（seek）要回到前一个关键帧再逐帧解码到目标帧，跨度超过关键帧间隔时才更省
+    if count <= 0:
+        return
+    if count >= seekThreshold:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, nextIndex)
+        return
+    for _ in range(count):
+        if not cap.grab():
+            return
+
+
+def analyzeChunk(videoPath, startFrame, endFrame, stride, total, seekThreshold=VIDEO_SEEK_THRESHOLD):
+    cap = cv2.VideoCapture(videoPath)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.set(cv2.CAP_PROP_POS_FRAMES, startFrame)
+    if _detector.tracker is not None:
+        # 各段互不相连，不能沿用上一段的轨迹
+        _detector.tracker.reset()
+    rows = []
+    frameIndex = startFrame
+    try:
+        while frameIndex < endFrame:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frameResult = _detector.detect(frame)
+            counts = frameResult.actionCounts
+            headUpRate, _, _ = computeRates(counts, frameResult.personCount, total)
+            rows.append((frameIndex / fps, headUpRate, frameResult.personCount, counts['Head Up'],
+                         counts['Head Down'], counts['Lying'], counts['Raise Hand']))
+            nextIndex = frameIndex + stride
+            _skipFrames(cap, min(nextIndex, endFrame) - frameIndex - 1, nextIndex, seekThreshold)
+            frameIndex = nextIndex
+    finally:
+        cap.release()
+    return startFrame, rows
+
+
+def splitChunks(frameCount, fps, stride, chunkSeconds):
+    # 按时长切分，切分点对齐到采样步长，保证与不切分时采样到的帧一致
+    chunkFrames = max(stride, int(chunkSeconds * fps) // stride * stride)
+    return [(start, min(start + chunkFrames, frameCount)) for start in range(0, frameCount, chunkFrames)]
+
+
+def analyzeVideo(videoPath, total, stride, chunkSeconds, pool, outDir, seekThreshold=VIDEO_SEEK_THRESHOLD):
+    cap = cv2.VideoCapture(videoPath)
+    if not cap.isOpened():
+        print(f"无法打开视频：{videoPath}")
+        return None
+    frameCount = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.release()
+
+    chunks = splitChunks(frameCount, fps, stride, chunkSeconds)
+    began = time.time()
+    results = {}
+    futures = [pool.submit(analyzeChunk, videoPath, start, end, stride, total, seekThreshold)
+               for start, end in chunks]
+    for done, future in enumerate(as_completed(futures), 1):
+        startFrame, rows = future.result()
+        results[startFrame] = rows
+        print(f"{os.path.basename(videoPath)}: {done}/{len(chunks)} 段完成")
+
+    rows = [row for startFrame in sorted(results) for row in results[startFrame]]
+    os.makedirs(outDir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(videoPath))[0]
+    filepath = os.path.join(outDir, f'抬头率数据_{stem}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
+    # 与会话导出使用同一份CSV格式
+    chunk = np.array([row + (total,) for row in rows], dtype=SESSION_DTYPE)
+    writeCsv(filepath, [chunk], total, len(chunk))
+    elapsed = time.time() - began
+    print(f"✅ {videoPath} -> {filepath}（{len(rows)}行，视频时长{frameCount / fps:.0f}秒，"
+          f"耗时{elapsed:.0f}秒，{frameCount / fps / max(elapsed, 1e-6):.1f}倍速）")
+    return filepath
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线分析录制的课堂视频，导出抬头率数据')
+    parser.add_argument('videos', nargs='+', help='Path to recorded lecture videos')
+    parser.add_argument('--total', type=int, required=True, help='Number of students in the class')
+    parser.add_argument('--stride', type=int, default=VIDEO_FRAME_STRIDE, help='Analyse every N-th frame')
+    parser.add_argument('--chunk_seconds', type=float, default=VIDEO_CHUNK_SECONDS, help='Length of each parallel chunk')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--seek_threshold', type=int, default=VIDEO_SEEK_THRESHOLD,
+                        help='Seek instead of grabbing when skipping at least this many frames')
+    parser.add_argument('--out_dir', default=EXPORT_DIR, help='Directory for exported CSV files')
+    args = parser.parse_args()
+    # 进程池（以及各进程中加载的模型）在所有视频之间复用
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_initWorker,
+                             initargs=(VIDEO_WORKER_THREADS,)) as pool:
+        for video in args.videos:
+            analyzeVideo(video, args.total, max(1, args.stride), args.chunk_seconds, pool, args.out_dir,
+                         args.seek_threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from config import MODEL_PATH
+from detection.image_processor import ImageProcessor
+from detection.posture import describePostures
+from detection.yolo_detector import YOLODetector
+from utils.data_processor import DataProcessor, HeatmapProcessor, computeRates
+from utils.session_store import SessionStore
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不报告峰值内存
+    resource = None
+
+
+def syntheticPersons(rng, count, width, height):
+    # 随机生成检测框和落在框内的17个关键点，用于在没有真实画面时测试统计相关的阶段
+    w = rng.uniform(0.05, 0.15, count) * width
+    h = w * rng.uniform(1.2, 2.0, count)
+    x1 = rng.uniform(0, width - w)
+    y1 = rng.uniform(0, np.maximum(height - h, 1))
+    boxes = np.column_stack([x1, y1, x1 + w, y1 + h]).astype(np.float32)
+    keypoints = np.empty((count, 17, 3), dtype=np.float32)
+    keypoints[:, :, 0] = x1[:, None] + rng.uniform(0, 1, (count, 17)) * w[:, None]
+    keypoints[:, :, 1] = y1[:, None] + rng.uniform(0, 1, (count, 17)) * h[:, None]
+    keypoints[:, :, 2] = rng.uniform(0, 1, (count, 17))
+    confs = rng.uniform(0.3, 1.0, count).astype(np.float32)
+    return boxes, confs, keypoints
+
+
+def syntheticFrames(rng, count, width, height):
+    frames = []
+    for _ in range(count):
+        frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        frames.append(cv2.GaussianBlur(frame, (9, 9), 0))
+    return frames
+
+
+def loadFrames(videoPath, count):
+    cap = cv2.VideoCapture(videoPath)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def skipReader(videoPath, method):
+    # 跳过 gap 帧后读取一帧：逐帧grab，或直接定位到目标帧；读到结尾时回到开头
+    cap = cv2.VideoCapture(videoPath)
+
+    def skip(gap):
+        if method == 'seek':
+            cap.set(cv2.CAP_PROP_POS_FRAMES, cap.get(cv2.CAP_PROP_POS_FRAMES) + gap)
+        else:
+            for _ in range(gap):
+                cap.grab()
+        if not cap.read()[0]:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return cap, skip
+
+
+def measure(fn, inputs, warmup=3):
+    # 返回每次调用的耗时（毫秒）
+    for item in inputs[:warmup]:
+        fn(item)
+    timings = np.empty(len(inputs), dtype=np.float64)
+    for i, item in enumerate(inputs):
+        began = time.perf_counter()
+        fn(item)
+        timings[i] = (time.perf_counter() - began) * 1000
+    return timings
+
+
+def summarize(timings):
+    mean = float(timings.mean()) if len(timings) else 0.0
+    p50, p90, p99 = (np.percentile(timings, [50, 90, 99]).tolist() if len(timings) else [0.0, 0.0, 0.0])
+    return {
+        'count': int(len(timings)),
+        'meanMs': mean,
+        'p50Ms': p50,
+        'p90Ms': p90,
+        'p99Ms': p99,
+        'fps': 1000.0 / mean if mean > 0 else 0.0,
+    }
+
+
+def peakTraced(fn, inputs):
+    # tracemalloc 的分配钩子会拖慢每次调用，峰值内存单独跑一遍测量，不与计时混在一起
+    tracemalloc.start()
+    for item in inputs:
+        fn(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def runStage(name, fn, inputs, results, context):
+    timings = measure(fn, inputs)
+    peak = peakTraced(fn, inputs)
+    entry = dict(context, stage=name, peakTracedBytes=int(peak), **summarize(timings))
+    results.append(entry)
+    print(f"{name:<16} {json.dumps(context, ensure_ascii=False):<40} "
+          f"p50={entry['p50Ms']:.3f}ms p99={entry['p99Ms']:.3f}ms fps={entry['fps']:.1f}")
+
+
+def runBenchmark(args):
+    rng = np.random.default_rng(args.seed)
+    width, height = args.frame_width, args.frame_height
+    frames = loadFrames(args.video, args.frames) if args.video else []
+    if not frames:
+        frames = syntheticFrames(rng, min(args.frames, 16), width, height)
+    height, width = frames[0].shape[:2]
+    inputsFrames = [frames[i % len(frames)] for i in range(args.frames)]
+    results = []
+    tempDir = tempfile.mkdtemp(prefix='bench_session_')
+
+    try:
+        detector = YOLODetector(MODEL_PATH, tracking=False)
+
+        # 模型推理（需要模型文件，使用 --skip_model 跳过）
+        if not args.skip_model:
+            runStage('detect', detector.detect, inputsFrames, results, {'frame': f'{width}x{height}'})
+            lastResult = detector.detect(inputsFrames[0])
+            runStage('annotate', detector.get_annotated_frame, [lastResult] * args.frames, results,
+                     {'frame': f'{width}x{height}'})
+
+        # 离线分析的跳帧方式：对比逐帧grab和定位的耗时，用于确定 VIDEO_SEEK_THRESHOLD
+        if args.video:
+            for gap in args.skip_gaps:
+                for method in ('grab', 'seek'):
+                    cap, skip = skipReader(args.video, method)
+                    runStage(f'skip-{method}', skip, [gap] * args.frames, results, {'gap': gap})
+                    cap.release()
+
+        for persons in args.persons:
+            samples = [syntheticPersons(rng, persons, width, height) for _ in range(args.frames)]
+            context = {'persons': persons}
+            runStage('classify', lambda s: detector.fromArrays(inputsFrames[0], None, *s), samples, results, context)
+            runStage('determine_action', lambda s: describePostures(s[2]), samples, results, context)
+            frameResults = [detector.fromArrays(inputsFrames[0], None, *s) for s in samples]
+
+            for imgSize in args.img_sizes:
+                context = {'persons': persons, 'imgSize': imgSize}
+                heatmapProcessor = HeatmapProcessor(imgSize)
+                runStage('heatmap', lambda r: heatmapProcessor.updateHeatmap(r.scaledRects(imgSize, imgSize)),
+                         frameResults, results, context)
+                imageProcessor = ImageProcessor(imgSize)
+                heatmap = heatmapProcessor.getHeatmap()
+                runStage('render', lambda f: imageProcessor.composeFrame(f, heatmap), inputsFrames, results, context)
+
+            store = SessionStore(os.path.join(tempDir, f'bench_{persons}.bin'))
+            dataProcessor = DataProcessor(store=store)
+
+            def updateData(item):
+                index, result = item
+                counts = result.actionCounts
+                rate = computeRates(counts, result.personCount, persons)[0]
+                dataProcessor.updateData(index * 0.1, rate, result.personCount, counts['Head Up'],
+                                         counts['Head Down'], counts['Lying'], counts['Raise Hand'], persons)
+            runStage('updateData', updateData, list(enumerate(frameResults)), results, {'persons': persons})
+            dataProcessor.close()
+    finally:
+        shutil.rmtree(tempDir, ignore_errors=True)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'frames': args.frames,
+        'source': args.video or 'synthetic',
+        'peakRssKb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None,
+        'results': results,
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检测到显示全流程的性能基准测试（无界面，可仅用CPU运行）')
+    parser.add_argument('--video', help='Recorded video to replay; synthetic frames are used if omitted')
+    parser.add_argument('--frames', type=int, default=200, help='Frames per stage')
+    parser.add_argument('--frame_width', type=int, default=1280)
+    parser.add_argument('--frame_height', type=int, default=720)
+    parser.add_argument('--img_sizes', type=int, nargs='+', default=[480, 720, 1152], help='Display/heatmap sizes')
+    parser.add_argument('--persons', type=int, nargs='+', default=[1, 20, 80], help='Synthetic person counts')
+    parser.add_argument('--skip_gaps', type=int, nargs='+', default=[4, 15, 30, 60, 120],
+                        help='Skipped-frame counts compared for grab vs seek (needs --video)')
+    parser.add_argument('--skip_model', action='store_true', help='Skip stages that need the YOLO model')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='JSON file for the results')
+    args = parser.parse_args()
+
+    report = runBenchmark(args)
+    output = args.output or os.path.join('benchmark_results', f'bench_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 结果已写入 {output}")
+
+
+if __name__ == "__main__":
+    main()
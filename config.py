@@ -1,9 +1,98 @@
 # 配置文件，集中管理路径、参数等
 MODEL_PATH = './model/yolo11n-pose.pt'
+INFERENCE_BACKEND = 'pytorch'  # pytorch / onnx / openvino / torchscript，非PyTorch后端自动导出并缓存在MODEL_PATH旁边
+INFERENCE_THREADS = 0  # 推理线程数，0表示使用默认值
+INFERENCE_HALF = False  # FP16（后端支持时）
+INFERENCE_INT8 = False  # INT8量化（OpenVINO等后端支持时）
+INFERENCE_IMGSZ = 640
+INFERENCE_WARMUP_RUNS = 1
 EXPORT_DIR = 'export_data'
+EXPORT_FORMAT = 'csv'  # csv / parquet / feather，后两者需要 pandas + pyarrow
+EXPORT_ROLLING_SECONDS = 0  # 大于0时每隔N秒把新记录追加到本次会话的滚动导出文件
+SESSION_DIR = 'session_data'  # 每次运行的逐帧指标记录
+SESSION_FLUSH_ROWS = 256
 FONT_PATH = 'ui/AlimamaShuHeiTi-Bold.ttf'
 BORDER_IMAGE_PATH = 'static/border.png'
+ASSET_CACHE_DIR = 'static/.cache'  # 按窗口尺寸缓存缩放后的界面素材
 IMG_SIZE_RATIO = 0.6
 WINDOW_SIZE_RATIO = 0.9
+CHART_TOLERANCE = 0.1  # 比例图数值变化小于该值（百分点）时跳过重绘
 HEATMAP_ALPHA = 0.3
+HEATMAP_COLORMAP = 'jet'  # OpenCV色表名称（如 jet、turbo、hot），也可以是matplotlib色表名称
 HEATMAP_DECAY = 0.9
+HEATMAP_DOWNSCALE = 1  # 热力图累加器的降采样倍数，1表示与显示尺寸相同
+PIPELINE_QUEUE_SIZE = 2
+PIPELINE_POLL_MS = 15
+
+# 多路教室视频流（无界面服务模式），source 可以是摄像头编号、视频文件或RTSP地址
+STREAM_SOURCES = [
+    {'name': 'classroom-1', 'source': 0, 'total': 40},
+]
+STREAM_TICK_SECONDS = 0.1
+STREAM_INFERENCE_BUDGET = 0.08
+STREAM_MAX_INTERVAL = 20
+STREAM_MAX_BATCH = 16
+STREAM_HEATMAP_SIZE = 320
+STREAM_EXPORT_INTERVAL = 300  # 每隔N秒在后台把新记录追加到各路的滚动导出文件，退出时再完整导出一次
+STREAM_LOG_INTERVAL = 10
+
+# 离线视频分析
+VIDEO_FRAME_STRIDE = 5
+VIDEO_CHUNK_SECONDS = 300
+VIDEO_SEEK_THRESHOLD = 30  # 跳过的帧数达到N时改用定位；应不小于视频的关键帧间隔，可用 benchmark.py --video 的 skip 阶段实测
+VIDEO_WORKER_THREADS = 1
+
+# 学生跟踪与姿态平滑
+TRACKING_ENABLED = True
+TRACK_IOU_THRESHOLD = 0.3
+TRACK_MAX_MISSES = 10  # 连续多少帧未匹配后删除轨迹
+TRACK_HYSTERESIS = 3  # 姿态需连续多少帧与当前状态不同才切换
+TRACK_MOVE_THRESHOLD = 0.02  # 关键点位移小于检测框高度的该比例时沿用上次分类
+
+# 自适应推理调度：画面静止时每隔若干帧才做一次完整推理，其余帧沿用上次结果
+SCHEDULER_ENABLED = True
+DETECT_MIN_INTERVAL = 1
+DETECT_MAX_INTERVAL = 10
+MOTION_LOW = 0.005  # 平均帧差低于该值视为静止，使用最大间隔
+MOTION_HIGH = 0.03  # 平均帧差高于该值视为有明显动作，每帧推理
+MOTION_SIZE = 160
+
+# 高分辨率摄像头切片推理
+TILING_ENABLED = False
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2  # 相邻切片的重叠比例
+TILE_NMS_IOU = 0.5
+TILE_INCLUDE_FULL_FRAME = True  # 整幅画面也参与推理，检测跨越多个切片的学生
+TILE_ROIS = {}  # 按摄像头配置座位区域，例如 {'0': [(0, 400, 1280, 1100), (1280, 400, 2560, 1100)]}
+TILE_LAYOUT_CACHE = 'model/tile_layouts.json'
+
+# 性能分析：各阶段耗时统计，关闭时几乎没有额外开销
+PROFILE_ENABLED = False
+PROFILE_WINDOW = 300  # 每个阶段保留最近多少次耗时用于计算分位数
+PROFILE_OVERLAY = False  # 在监测画面上叠加显示各阶段耗时
+PROFILE_LOG_PATH = 'logs/profile.jsonl'
+PROFILE_LOG_INTERVAL = 10  # 每隔多少秒把统计追加写入日志，0表示只在退出时写入
+
+# 历史会话统计分析
+ANALYTICS_CACHE_DIR = 'export_data/.cache'  # 导出文件的列式缓存和聚合结果缓存
+ANALYTICS_THRESHOLD = 60  # 抬头率低于该值（%）的时长计入“低于阈值时长”
+ANALYTICS_BUCKET_SECONDS = 300
+ANALYTICS_MAX_GAP = 5  # 相邻两行间隔超过该秒数视为中断，不计入时长
+
+# 推理结果日志：记录每次推理的检测框和关键点，之后可用 main.py --replay 不经模型回放分析
+KEYPOINT_LOG_ENABLED = False
+KEYPOINT_LOG_DIR = 'session_data'
+REPLAY_BATCH_FRAMES = 2000  # 回放时每次界面刷新之间处理的帧数
+
+# 检测统计：累计值之外再维护若干滑动窗口（名称: 秒数），每帧增量更新
+STATS_WINDOWS = {'10s': 10, '1min': 60}
+STATS_HISTORY_SIZE = 8192  # 滑动窗口最多保留的推理帧数，需覆盖最长窗口内的帧数
+
+# 网页监测服务（asyncio，仅用标准库）：/metrics 返回JSON，/ws 推送指标，/stream 输出MJPEG画面
+WEB_SERVER_ENABLED = False  # 也可以用 main.py --serve 或 multi_stream.py --serve 开启
+WEB_HOST = '127.0.0.1'  # 需要在局域网内访问时改为 '0.0.0.0'
+WEB_PORT = 8080
+WEB_PUSH_INTERVAL = 0.5  # WebSocket推送指标的最短间隔（秒）
+WEB_CLIENT_TIMEOUT = 10  # 客户端在该时间内收不完一帧或一条消息时断开
+MJPEG_QUALITY = 80
+MJPEG_MAX_FPS = 15  # 画面每秒最多编码的帧数，所有观看者共享同一次编码
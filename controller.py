@@ -1,115 +1,332 @@
 from ui.main_window import MainWindow
 from detection.yolo_detector import YOLODetector
 from detection.image_processor import ImageProcessor
-from utils.data_processor import DataProcessor, HeatmapProcessor
+from detection.scheduler import AdaptiveScheduler
+from utils.data_processor import DataProcessor, HeatmapProcessor, computeRates
+from utils.exporter import ExportWorker
+from utils.pipeline import DetectionPipeline
+from utils.profiler import StageProfiler
+from utils.keypoint_log import KeypointLogReader
+from utils.web_server import WebServer, buildMetrics
 import cv2
+import numpy as np
+import queue
+import threading
 import time
-from config import MODEL_PATH
+from config import (MODEL_PATH, PIPELINE_QUEUE_SIZE, PIPELINE_POLL_MS, EXPORT_ROLLING_SECONDS, SCHEDULER_ENABLED,
+                    PROFILE_OVERLAY, PROFILE_LOG_PATH, PROFILE_LOG_INTERVAL, KEYPOINT_LOG_ENABLED,
+                    REPLAY_BATCH_FRAMES, WEB_SERVER_ENABLED)
 
 class MainController:
-    def __init__(self):
-        self.cap = cv2.VideoCapture(0)
+    def __init__(self, replayPath=None, serve=WEB_SERVER_ENABLED):
+        # 先创建并显示窗口，摄像头和模型在后台线程中加载
         self.app = MainWindow()
+        self.cap = None
+        self.yoloDetector = None
+        self.pipeline = None
         self.imgSize = self.app.getImgSize()
-        self.yoloDetector = YOLODetector(MODEL_PATH)
         self.imageProcessor = ImageProcessor(self.imgSize)
         self.dataProcessor = DataProcessor()
         self.heatmapProcessor = HeatmapProcessor(self.imgSize)
+        self.scheduler = AdaptiveScheduler() if SCHEDULER_ENABLED else None
+        self.lastResult = None
+        self.profiler = StageProfiler()
         self.startTime = time.time()
+        # 导出在后台线程中执行，进度消息经队列回到Tk线程显示
+        self.exportMessages = queue.Queue()
+        self.exportStatus = ''
+        self.exportWorker = ExportWorker(self.exportMessages.put)
+        # 网页监测服务：其他人通过浏览器查看指标和画面，不增加推理开销
+        self.webServer = None
+        if serve:
+            self.webServer = WebServer()
+            self.webServer.start()
         self._bind_export()
-        self._start_detection()
+        self._bind_profile_log()
+        if replayPath:
+            self._start_replay(replayPath)
+        else:
+            self._start_loading()
+
+    def _start_loading(self):
+        loadMessages = queue.Queue()
+
+        def load():
+            try:
+                loadMessages.put(('progress', "正在打开摄像头…", 10))
+                cap = cv2.VideoCapture(0)
+                loadMessages.put(('progress', "正在加载姿态检测模型…", 40))
+                detector = YOLODetector(MODEL_PATH, cameraKey='0')
+                detector.loadModel()
+                if KEYPOINT_LOG_ENABLED:
+                    detector.startRecording()
+                loadMessages.put(('done', cap, detector))
+            except Exception as e:
+                loadMessages.put(('error', str(e)))
+        threading.Thread(target=load, name='loader', daemon=True).start()
+
+        def poll_loading():
+            while True:
+                try:
+                    message = loadMessages.get_nowait()
+                except queue.Empty:
+                    break
+                if message[0] == 'progress':
+                    self.app.statsFrame.show_progress(message[1], message[2])
+                elif message[0] == 'done':
+                    self.app.statsFrame.show_progress("加载完成", 100)
+                    self.app.statsFrame.hide_progress()
+                    self.cap, self.yoloDetector = message[1], message[2]
+                    self.startTime = time.time()
+                    self._start_detection()
+                    return
+                else:
+                    self.app.statsFrame.hide_progress()
+                    self.app.statsFrame.var.set(f"❌ 加载失败：{message[1]}")
+                    return
+            self.app.window.after(50, poll_loading)
+        self.app.statsFrame.show_progress("正在启动…", 0)
+        poll_loading()
+
+    def _start_replay(self, path):
+        # 回放推理结果日志：不打开摄像头、不加载模型，按批驱动统计、热力图和导出
+        try:
+            reader = KeypointLogReader(path)
+        except (OSError, ValueError) as e:
+            self.app.statsFrame.var.set(f"❌ 无法读取回放日志：{e}")
+            return
+        self.yoloDetector = YOLODetector(MODEL_PATH, cameraKey='replay')
+        self.lastResult = None
+        if self.scheduler is not None:
+            self.scheduler.forceDetect()
+        width, height = reader.frameSize
+        blank = np.zeros((height or 480, width or 640, 3), dtype=np.uint8)
+        position = [0]
+        began = time.perf_counter()
+        startTimestamp = float(reader.frames[0]['timestamp']) if len(reader) else 0.0
+
+        def replay_batch():
+            self._drainExportMessages()
+            try:
+                total = int(self.app.inputFrame.total_entry.get())
+            except ValueError:
+                total = 0
+            frameResult = None
+            timestamp = startTimestamp
+            stop = min(position[0] + REPLAY_BATCH_FRAMES, len(reader))
+            for _, timestamp, boxes, confs, keypoints in reader.iterFrames(position[0], stop):
+                frameResult = self.yoloDetector.fromArrays(blank, None, boxes, confs, keypoints, timestamp=timestamp)
+                self.heatmapProcessor.accumulate(frameResult.scaledRects(self.imgSize, self.imgSize))
+                if total > 0:
+                    counts = frameResult.actionCounts
+                    headUpRate = computeRates(counts, frameResult.personCount, total)[0]
+                    self.dataProcessor.updateData(timestamp - startTimestamp, headUpRate, frameResult.personCount,
+                                                  counts['Head Up'], counts['Head Down'], counts['Lying'],
+                                                  counts['Raise Hand'], total)
+            position[0] = stop
+            if frameResult is not None:
+                # 每批只绘制最后一帧
+                overlay = self.imageProcessor.composeFrame(self.yoloDetector.get_annotated_frame(frameResult),
+                                                           self.heatmapProcessor.getHeatmap())
+                self._renderOutput(frameResult, overlay, self.yoloDetector.stats.snapshots(), timestamp, record=False)
+            elapsed = time.perf_counter() - began
+            progress = f"回放进度：{position[0]}/{len(reader)} 帧（{position[0] / max(elapsed, 1e-6):.0f} 帧/秒）"
+            self.app.statsFrame.var.set(self.app.statsFrame.var.get() + f"\n{progress}")
+            if position[0] < len(reader):
+                self.app.window.after(1, replay_batch)
+            else:
+                poll_export(self.app.statsFrame.var.get(), self.exportStatus)
+
+        def poll_export(baseText, shown):
+            # 回放结束后不再刷新画面，最新的导出进度或结果显示在状态栏末尾
+            self._drainExportMessages()
+            if self.exportStatus != shown:
+                shown = self.exportStatus
+                self.app.statsFrame.var.set(baseText + f"\n{shown}")
+            self.app.window.after(PIPELINE_POLL_MS, poll_export, baseText, shown)
+        self.app.window.after(50, replay_batch)
 
     def _start_detection(self):
-        def real_time_detection():
-            ret, frame = self.cap.read()
-            if ret:
-                faceRects, faceCount = self.yoloDetector.detectFaces(frame)
-                annotatedFrame = self.yoloDetector.get_annotated_frame(frame)
-                frameResized, greyResized = self.imageProcessor.getResizedFrame(frame)
-                resizedFaceRects, _ = self.yoloDetector.detectFaces(frameResized)
-                heatmapRects = [(rect[0], rect[1], rect[2], rect[3]) for rect in resizedFaceRects]
+        self.pipeline = DetectionPipeline(self.cap, self._processFrame, PIPELINE_QUEUE_SIZE)
+        self.pipeline.start()
+
+        def consume_results():
+            self._drainExportMessages()
+            output = self.pipeline.poll()
+            if output is not None:
+                self._renderOutput(*output)
+            self.app.window.after(PIPELINE_POLL_MS, consume_results)
+        consume_results()
+
+    def _drainExportMessages(self):
+        while True:
+            try:
+                self.exportStatus = self.exportMessages.get_nowait()
+            except queue.Empty:
+                return
+
+    def _processFrame(self, frame, timestamp):
+        # 在推理线程中执行：推理、标注、热力图叠加，不触碰任何Tk对象
+        profiler = self.profiler
+        with profiler.stage('total'):
+            with profiler.stage('schedule'):
+                _, greyResized = self.imageProcessor.getResizedFrame(frame)
+                shouldDetect = self.scheduler is None or self.scheduler.shouldDetect(greyResized) or self.lastResult is None
+            if shouldDetect:
+                with profiler.stage('detect'):
+                    frameResult = self.yoloDetector.detect(frame, timestamp=timestamp)
+                profiler.recordSpeed(self.yoloDetector.lastSpeed)
+            else:
+                with profiler.stage('propagate'):
+                    frameResult = self.lastResult.propagate(frame)
+            self.lastResult = frameResult
+            with profiler.stage('annotate'):
+                annotatedFrame = self.yoloDetector.get_annotated_frame(frameResult)
+            with profiler.stage('heatmap'):
+                heatmapRects = frameResult.scaledRects(self.imgSize, self.imgSize)
                 heatmap = self.heatmapProcessor.updateHeatmap(heatmapRects)
-                imgTk = self.imageProcessor.processFrame(annotatedFrame, heatmap)
+            with profiler.stage('compose'):
+                overlay = self.imageProcessor.composeFrame(annotatedFrame, heatmap)
+            # 只取数值快照交给Tk线程，格式化在显示时进行
+            snapshots = self.yoloDetector.stats.snapshots()
+        if PROFILE_OVERLAY:
+            profiler.drawOverlay(overlay)
+        return frameResult, overlay, snapshots, timestamp
+
+    def _renderOutput(self, frameResult, overlay, snapshots, timestamp, record=True):
+        # 在Tk线程中执行：只负责绘制和更新统计
+        with self.profiler.stage('display'):
+            imgTk = self.imageProcessor.toPhotoImage(overlay)
+            # 同一个PhotoImage原地更新，只有首次（或重新创建时）才需要重新设置到标签上
+            if self.app.displayFrame.image_label.image is not imgTk:
                 self.app.displayFrame.image_label.configure(image=imgTk)
                 self.app.displayFrame.image_label.image = imgTk
-                try:
-                    total = int(self.app.inputFrame.total_entry.get())
-                    threshold = float(self.app.inputFrame.threshold_entry.get())
-                    classStats = self.yoloDetector.get_class_stats()
-                    headUpCount = 0
-                    headDownCount = faceCount
-                    lyingCount = 0
-                    handCount = 0
-                    personCount = 0
-                    if classStats:
-                        for stat in classStats:
-                            if stat['class'] == 'Person':
-                                personCount = stat['count']
-                            elif stat['class'] == 'Head Up':
-                                headUpCount = stat['count']
-                            elif stat['class'] == 'Head Down':
-                                headDownCount = stat['count']
-                            elif stat['class'] == 'Lying':
-                                lyingCount = stat['count']
-                            elif stat['class'] == 'Raise Hand':
-                                handCount = stat['count']
-                    if total > 0:
-                        if personCount > 0:
-                            headUpRate = (headUpCount / total) * 100
-                        else:
-                            headUpRate = 0
-                        handUpRate = (handCount / total) * 100 if total > 0 else 0
-                        headDownLyingRate = ((headDownCount + lyingCount) / total) * 100 if total > 0 else 0
-                        currentTime = time.time() - self.startTime
-                        self.dataProcessor.updateData(currentTime, headUpRate, personCount,headUpCount, headDownCount, lyingCount, handCount)
-                        statusText = f"实时抬头率：{headUpRate:.1f}%\n"
-                        statusText += f"检测到的总人数：{personCount}\n"
-                        statusText += f"抬头人数：{headUpCount}\n"
-                        statusText += f"低头人数：{headDownCount}\n"
-                        statusText += f"趴着人数：{lyingCount}\n"
-                        statusText += f"举手人数：{handCount}\n"
-                        statusText += f"设定总人数：{total}"
-                        personStat = None
-                        headUpStat = None
-                        headDownStat = None
-                        lyingStat = None
-                        handStat = None
-                        warningText = None
-                        if classStats:
-                            for stat in classStats:
-                                if stat['class'] == 'Person':
-                                    personStat = f"{stat['count']}个 (置信度: {stat['avg_confidence']})"
-                                elif stat['class'] == 'Head Up':
-                                    headUpStat = f"{stat['count']}个"
-                                elif stat['class'] == 'Head Down':
-                                    headDownStat = f"{stat['count']}个"
-                                elif stat['class'] == 'Lying':
-                                    lyingStat = f"{stat['count']}个"
-                                elif stat['class'] == 'Raise Hand':
-                                    handStat = f"{stat['count']}个"
-                        if headUpRate < threshold:
-                            warningText = "⚠️ 警告：当前抬头率低于设定阈值！"
-                            self.app.statsFrame.frame.configure(style='Warning.TLabelframe')
-                        else:
-                            self.app.statsFrame.frame.configure(style='TLabelframe')
-                        isLowHeadOrLying = headDownCount > 0 or lyingCount > 0
-                        self.app.statsFrame.update_stats(statusText, personStat, headUpStat, headDownStat, lyingStat, handStat, warningText, is_low_head_or_lying=isLowHeadOrLying)
-                        self.app.trendFrame.update_bars(headUpRate, handUpRate, headDownLyingRate)
-                except ValueError:
-                    self.app.statsFrame.var.set("请输入有效的总人数")
-            self.app.window.after(100, real_time_detection)
-        real_time_detection()
+            if self.webServer is not None and self.webServer.wantsFrames():
+                self.webServer.publish(frame=overlay, rgb=True)
+        with self.profiler.stage('stats'):
+            self._updateStats(frameResult, snapshots, timestamp, record)
+        if self.profiler.enabled and self.pipeline is not None:
+            stats = self.pipeline.getStats()
+            self.profiler.setCounters(captureDropped=stats['capture']['dropped'],
+                                      renderDropped=stats['render']['queueDropped'] + stats['render']['renderDropped'],
+                                      errors=stats['inference']['errors'])
+            tracker = self.yoloDetector.tracker
+            if tracker is not None:
+                # 跟踪器因关键点未移动而跳过重新分类的人次
+                self.profiler.setCounters(tracks=len(tracker.ids), classifySkipped=tracker.skipped)
+            self.app.statsFrame.update_perf(self.profiler.describe())
+
+    def _updateStats(self, frameResult, snapshots, timestamp, record=True):
+        try:
+            total = int(self.app.inputFrame.total_entry.get())
+            threshold = float(self.app.inputFrame.threshold_entry.get())
+            session = snapshots['session']
+            counts = frameResult.actionCounts
+            personCount = session.personCount
+            headUpCount = counts['Head Up']
+            headDownCount = counts['Head Down']
+            lyingCount = counts['Lying']
+            handCount = counts['Raise Hand']
+            if total > 0:
+                headUpRate, handUpRate, headDownLyingRate = computeRates(frameResult.actionCounts, personCount, total)
+                currentTime = timestamp - self.startTime
+                if record:
+                    self.dataProcessor.updateData(currentTime, headUpRate, personCount,headUpCount, headDownCount, lyingCount, handCount, total)
+                if self.webServer is not None:
+                    self.webServer.publish(metrics=buildMetrics(timestamp, total, personCount, counts,
+                                                                (headUpRate, handUpRate, headDownLyingRate), snapshots))
+                statusText = f"实时抬头率：{headUpRate:.1f}%\n"
+                statusText += f"检测到的总人数：{personCount}\n"
+                statusText += f"抬头人数：{headUpCount}\n"
+                statusText += f"低头人数：{headDownCount}\n"
+                statusText += f"趴着人数：{lyingCount}\n"
+                statusText += f"举手人数：{handCount}\n"
+                statusText += f"设定总人数：{total}\n"
+                for name, snapshot in snapshots.items():
+                    if name != 'session' and snapshot.frames:
+                        statusText += f"近{name}平均抬头率：{snapshot.action('Head Up', mean=True) / total * 100:.1f}%\n"
+                tracker = self.yoloDetector.tracker
+                if tracker is not None:
+                    # 平滑后的状态进入次数，例如本节课累计举手多少次
+                    events = tracker.events
+                    statusText += (f"累计举手：{events[3]}次  趴下：{events[2]}次  "
+                                   f"低头：{events[0]}次\n")
+                if self.pipeline is not None:
+                    statusText += self.pipeline.describeStats()
+                if self.scheduler is not None:
+                    statusText += f"  检测间隔：{self.scheduler.interval}帧"
+                if self.exportStatus:
+                    statusText += f"\n{self.exportStatus}"
+                personStat = None
+                headUpStat = None
+                headDownStat = None
+                lyingStat = None
+                handStat = None
+                warningText = None
+                # 数值只在这里格式化为界面文字
+                if personCount > 0:
+                    personStat = f"{personCount}个 (置信度: {session.meanConfidence:.3f})"
+                if headUpCount > 0:
+                    headUpStat = f"{headUpCount}个"
+                if headDownCount > 0:
+                    headDownStat = f"{headDownCount}个"
+                if lyingCount > 0:
+                    lyingStat = f"{lyingCount}个"
+                if handCount > 0:
+                    handStat = f"{handCount}个"
+                if headUpRate < threshold:
+                    warningText = "⚠️ 警告：当前抬头率低于设定阈值！"
+                    self.app.statsFrame.frame.configure(style='Warning.TLabelframe')
+                else:
+                    self.app.statsFrame.frame.configure(style='TLabelframe')
+                isLowHeadOrLying = headDownCount > 0 or lyingCount > 0
+                self.app.statsFrame.update_stats(statusText, personStat, headUpStat, headDownStat, lyingStat, handStat, warningText, is_low_head_or_lying=isLowHeadOrLying)
+                with self.profiler.stage('chart'):
+                    self.app.trendFrame.update_bars(headUpRate, handUpRate, headDownLyingRate)
+        except ValueError:
+            self.app.statsFrame.var.set("请输入有效的总人数")
 
     def _bind_export(self):
         def export_data_callback():
             try:
                 total = int(self.app.inputFrame.total_entry.get())
-                self.dataProcessor.exportData(total, self.app.statsFrame.var)
-                self.yoloDetector.reset_stats()
+                self.exportWorker.exportSession(self.dataProcessor, total)
+                if self.yoloDetector is not None:
+                    self.yoloDetector.reset_stats()
+                if self.scheduler is not None:
+                    # 统计清零后下一帧做一次完整推理，不沿用清零前的检测结果
+                    self.scheduler.forceDetect()
             except ValueError:
                 self.app.statsFrame.var.set(self.app.statsFrame.var.get() + "\n\n⚠️ 请输入有效的总人数")
         self.app.exportFrame.export_button.configure(command=export_data_callback)
 
+        def rolling_export():
+            try:
+                total = int(self.app.inputFrame.total_entry.get())
+                self.exportWorker.appendRolling(self.dataProcessor, total)
+            except ValueError:
+                pass
+            self.app.window.after(int(EXPORT_ROLLING_SECONDS * 1000), rolling_export)
+        if EXPORT_ROLLING_SECONDS > 0:
+            self.app.window.after(int(EXPORT_ROLLING_SECONDS * 1000), rolling_export)
+
+    def _bind_profile_log(self):
+        def dump_profile():
+            self.profiler.dump(PROFILE_LOG_PATH)
+            self.app.window.after(int(PROFILE_LOG_INTERVAL * 1000), dump_profile)
+        if self.profiler.enabled and PROFILE_LOG_INTERVAL > 0:
+            self.app.window.after(int(PROFILE_LOG_INTERVAL * 1000), dump_profile)
+
     def run(self):
         self.app.run()
-        self.cap.release()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        if self.cap is not None:
+            self.cap.release()
+        if self.yoloDetector is not None:
+            self.yoloDetector.stopRecording()
+        if self.webServer is not None:
+            self.webServer.stop()
+        self.exportWorker.stop()
+        self.dataProcessor.close()
+        self.profiler.dump(PROFILE_LOG_PATH)
@@ -0,0 +1,131 @@
+import glob
+import os
+import shutil
+import numpy as np
+from config import (INFERENCE_BACKEND, INFERENCE_THREADS, INFERENCE_HALF, INFERENCE_INT8,
+                    INFERENCE_IMGSZ, INFERENCE_WARMUP_RUNS)
+
+# 导出格式对应的文件（或目录）后缀，与ultralytics导出结果一致
+EXPORT_SUFFIXES = {
+    'onnx': '.onnx',
+    'openvino': '_openvino_model',
+    'torchscript': '.torchscript',
+}
+
+
+def exportedPath(modelPath, backend, half=False, int8=False, imgsz=INFERENCE_IMGSZ):
+    # 不同精度和输入尺寸的导出结果分别缓存在模型文件旁边
+    base = os.path.splitext(modelPath)[0]
+    precision = '_int8' if int8 else ('_fp16' if half else '')
+    return f'{base}_{imgsz}{precision}{EXPORT_SUFFIXES[backend]}'
+
+
+def _halfApplied(backend, half):
+    # ultralytics 在CPU上导出ONNX/TorchScript时会忽略 half=True，导出的仍是FP32模型，不能按FP16命名
+    if not half or backend not in ('onnx', 'torchscript'):
+        return half
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def _isStale(target, modelPath):
+    if not os.path.exists(target):
+        return True
+    return os.path.exists(modelPath) and os.path.getmtime(target) < os.path.getmtime(modelPath)
+
+
+def configureThreads(threads):
+    # 环境变量需在加载推理库之前设置，只对使用OpenMP/MKL的库（PyTorch CPU推理）生效；
+    # ONNX Runtime/OpenVINO 会话的线程数由 limitSessionThreads 单独设置
+    if threads <= 0:
+        return
+    for name in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[name] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def limitSessionThreads(model, backend, path, threads, imgsz=INFERENCE_IMGSZ):
+    # ultralytics 创建ONNX Runtime/OpenVINO会话时不传线程数，只能在会话建立后按线程数重建；
+    # 找不到会话（ultralytics版本不同）时只有PyTorch部分受线程数限制
+    if threads <= 0 or backend not in ('onnx', 'openvino'):
+        return
+    if model.predictor is None:
+        warmUp(model, imgsz, 1)
+    autoBackend = model.predictor.model
+    owner = getattr(autoBackend, 'backend', autoBackend)
+    try:
+        if backend == 'onnx':
+            import onnxruntime
+            providers = owner.session.get_providers()
+            if providers != ['CPUExecutionProvider']:
+                return
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            owner.session = onnxruntime.InferenceSession(path, options, providers=providers)
+        else:
+            import openvino as ov
+            if 'CPU' not in owner.ov_compiled_model.get_property('EXECUTION_DEVICES'):
+                return
+            core = ov.Core()
+            config = {'PERFORMANCE_HINT': 'LATENCY', 'INFERENCE_NUM_THREADS': threads}
+            compiled = core.compile_model(core.read_model(glob.glob(os.path.join(path, '*.xml'))[0]), 'CPU', config)
+            owner.ov_compiled_model = compiled
+            if hasattr(owner, 'compile_model'):
+                # 新版本在输入尺寸变化时会重新编译，同样要带上线程数
+                owner.compile_model = lambda ovModel: core.compile_model(ovModel, 'CPU', config)
+    except Exception as e:
+        print(f"无法限制 {backend} 推理线程数，只有PyTorch部分受 INFERENCE_THREADS 限制：{e}")
+
+
+def exportModel(modelPath, backend, half=False, int8=False, imgsz=INFERENCE_IMGSZ):
+    from ultralytics import YOLO
+    half = _halfApplied(backend, half)
+    target = exportedPath(modelPath, backend, half, int8, imgsz)
+    if not _isStale(target, modelPath):
+        return target
+    print(f"正在导出 {backend} 模型：{target}")
+    exported = YOLO(modelPath).export(format=backend, half=half, int8=int8, imgsz=imgsz,
+                                      dynamic=backend in ('onnx', 'openvino'))
+    if os.path.abspath(exported) != os.path.abspath(target):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        shutil.move(exported, target)
+    return target
+
+
+def warmUp(model, imgsz=INFERENCE_IMGSZ, runs=INFERENCE_WARMUP_RUNS):
+    # 启动时先推理几次空白图像，完成图优化和内存分配，避免第一帧卡顿
+    blank = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    for _ in range(runs):
+        model(blank, verbose=False)
+
+
+def loadModel(modelPath, backend=INFERENCE_BACKEND, threads=INFERENCE_THREADS, half=INFERENCE_HALF,
+              int8=INFERENCE_INT8, imgsz=INFERENCE_IMGSZ, warmupRuns=INFERENCE_WARMUP_RUNS):
+    # 按配置加载PyTorch模型或自动导出并缓存的ONNX/OpenVINO/TorchScript模型，对外接口完全相同
+    configureThreads(threads)
+    from ultralytics import YOLO
+    model = None
+    if backend != 'pytorch':
+        if backend not in EXPORT_SUFFIXES:
+            print(f"未知的推理后端 {backend}，使用 PyTorch")
+        else:
+            try:
+                exported = exportModel(modelPath, backend, half, int8, imgsz)
+                model = YOLO(exported, task='pose')
+                limitSessionThreads(model, backend, exported, threads, imgsz)
+            except Exception as e:
+                print(f"{backend} 模型导出或加载失败，使用 PyTorch：{e}")
+    if model is None:
+        model = YOLO(modelPath)
+    if warmupRuns > 0:
+        warmUp(model, imgsz, warmupRuns)
+    return model
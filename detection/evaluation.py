@@ -0,0 +1,157 @@
+import glob
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from detection.posture import DEFAULT_RULES, classifyPostures, describeFlags
+
+# 评估用的真值字段，均为长度N的布尔数组
+TRUTH_KEYS = ['headDown', 'headUp', 'lying', 'raiseHand']
+
+_sweepData = None
+
+
+def _readPredictTxt(directory, imageSize=None):
+    # YOLO predict save_txt 输出：cls cx cy w h (kx ky kv)*K [conf]，坐标为归一化值
+    boxes, confs, keypoints = [], [], []
+    for path in sorted(glob.glob(os.path.join(directory, '*.txt'))):
+        if os.path.getsize(path) == 0:
+            continue
+        rows = np.loadtxt(path, dtype=np.float32, ndmin=2)
+        cols = rows.shape[1]
+        hasConf = (cols - 5) % 3 != 0
+        kpts = rows[:, 5:cols - 1 if hasConf else cols].reshape(len(rows), -1, 3)
+        cx, cy, w, h = rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4]
+        boxes.append(np.column_stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]))
+        confs.append(rows[:, -1] if hasConf else np.ones(len(rows), dtype=np.float32))
+        keypoints.append(kpts)
+    if not boxes:
+        return np.zeros((0, 17, 3), dtype=np.float32), np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+    boxes, confs, keypoints = np.concatenate(boxes), np.concatenate(confs), np.concatenate(keypoints)
+    if imageSize is not None:
+        scale = np.array(imageSize, dtype=np.float32)
+        boxes *= np.tile(scale, 2)
+        keypoints[:, :, :2] *= scale
+    return keypoints, boxes, confs
+
+
+def loadKeypointDump(path, truthPath=None, imageSize=None):
+    # .npz（keypoints/boxes/confs 以及可选的真值字段）、推理结果日志（.kpi）或 predict 输出目录
+    if os.path.isdir(path):
+        keypoints, boxes, confs = _readPredictTxt(path, imageSize)
+        truth = {}
+    elif path.endswith('.kpi'):
+        from utils.keypoint_log import KeypointLogReader
+        persons = KeypointLogReader(path).persons
+        keypoints, boxes, confs = (np.array(persons['keypoints']), np.array(persons['box']),
+                                   np.array(persons['conf']))
+        truth = {}
+    else:
+        with np.load(path) as dump:
+            keypoints = dump['keypoints'].astype(np.float32)
+            boxes = dump['boxes'].astype(np.float32)
+            confs = dump['confs'].astype(np.float32) if 'confs' in dump else np.ones(len(boxes), dtype=np.float32)
+            truth = {key: dump[key].astype(bool) for key in TRUTH_KEYS if key in dump}
+    if truthPath:
+        with np.load(truthPath) as dump:
+            truth.update({key: dump[key].astype(bool) for key in TRUTH_KEYS if key in dump})
+    for key, values in truth.items():
+        if len(values) != len(keypoints):
+            raise ValueError(f"{key}: {len(values)} labels for {len(keypoints)} persons")
+    return {'keypoints': keypoints, 'boxes': boxes, 'confs': confs, 'truth': truth}
+
+
+def mergeDumps(dumps):
+    # 多个文件拼接在一起评估；只保留所有文件都有的真值字段
+    keys = set(TRUTH_KEYS)
+    for dump in dumps:
+        keys &= set(dump['truth'])
+    return {
+        'keypoints': np.concatenate([d['keypoints'] for d in dumps]),
+        'boxes': np.concatenate([d['boxes'] for d in dumps]),
+        'confs': np.concatenate([d['confs'] for d in dumps]),
+        'truth': {key: np.concatenate([d['truth'][key] for d in dumps]) for key in TRUTH_KEYS if key in keys},
+    }
+
+
+def confusion(predicted, truth):
+    # 2x2 混淆矩阵 [[TN, FP], [FN, TP]]
+    return np.bincount(truth.astype(np.int64) * 2 + predicted.astype(np.int64), minlength=4).reshape(2, 2)
+
+
+def scores(matrix):
+    tp, fp, fn = matrix[1, 1], matrix[0, 1], matrix[1, 0]
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    accuracy = np.trace(matrix) / matrix.sum() if matrix.sum() else 0.0
+    return {'precision': float(precision), 'recall': float(recall), 'f1': float(f1), 'accuracy': float(accuracy)}
+
+
+def evaluateRules(data, rules=DEFAULT_RULES, confThreshold=0.5):
+    batch = classifyPostures(data['keypoints'], data['boxes'], data['confs'], confThreshold, rules)
+    result = {}
+    for key, truth in data['truth'].items():
+        matrix = confusion(getattr(batch, key), truth)
+        result[key] = dict(scores(matrix), confusion=matrix.tolist())
+    if result:
+        result['meanF1'] = float(np.mean([result[key]['f1'] for key in data['truth']]))
+    return result
+
+
+def compareRuleSets(data, rules=DEFAULT_RULES, confThreshold=0.5):
+    # classifyPostures（统计用）与 determine_action（标注文字用）两套规则的一致程度
+    batch = classifyPostures(data['keypoints'], data['boxes'], data['confs'], confThreshold, rules)
+    headUp, lying, raiseHand = describeFlags(data['keypoints'], confThreshold)
+    valid = batch.valid
+    result = {}
+    for key, described in (('headUp', headUp), ('lying', lying), ('raiseHand', raiseHand)):
+        classified = getattr(batch, key)[valid]
+        matrix = confusion(described[valid], classified)
+        result[key] = {'agreement': float(np.trace(matrix) / max(matrix.sum(), 1)), 'confusion': matrix.tolist()}
+    return result
+
+
+def parseGrid(specs):
+    # ["lyingMargin=0.1,0.2", "confThreshold=0.3,0.5"] -> 参数组合列表
+    names, values = [], []
+    for spec in specs:
+        name, _, items = spec.partition('=')
+        names.append(name.strip())
+        values.append([float(v) for v in items.split(',') if v.strip()])
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def _initSweep(data):
+    global _sweepData
+    _sweepData = data
+
+
+def _evaluateChunk(chunk):
+    results = []
+    for params in chunk:
+        params = dict(params)
+        confThreshold = params.pop('confThreshold', 0.5)
+        if 'wristAboveElbow' in params:
+            params['wristAboveElbow'] = bool(params['wristAboveElbow'])
+        rules = DEFAULT_RULES.replace(**params)
+        results.append((dict(params, confThreshold=confThreshold), evaluateRules(_sweepData, rules, confThreshold)))
+    return results
+
+
+def sweep(data, grid, workers=None, chunkSize=16):
+    # 网格搜索：每个进程只接收一次数据，之后按块计算各参数组合，结果按平均F1从高到低排序
+    if not data['truth']:
+        raise ValueError("Threshold sweep needs ground-truth labels")
+    chunks = [grid[i:i + chunkSize] for i in range(0, len(grid), chunkSize)]
+    results = []
+    if workers == 1 or len(chunks) <= 1:
+        _initSweep(data)
+        for chunk in chunks:
+            results.extend(_evaluateChunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initSweep, initargs=(data,)) as pool:
+            for chunkResults in pool.map(_evaluateChunk, chunks):
+                results.extend(chunkResults)
+    results.sort(key=lambda item: item[1]['meanF1'], reverse=True)
+    return results
@@ -1,22 +1,86 @@
 import cv2
+import numpy as np
 from PIL import Image, ImageTk
-from matplotlib import cm
+from config import HEATMAP_ALPHA, HEATMAP_COLORMAP, PIPELINE_QUEUE_SIZE
+
+def buildColormapLut(name):
+    # 预先生成 256 级的 RGB 查找表，优先使用OpenCV内置色表，没有时才借助matplotlib生成一次
+    cvColormap = getattr(cv2, f'COLORMAP_{name.upper()}', None)
+    if cvColormap is not None:
+        bgr = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), cvColormap)
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB).reshape(256, 3)
+    try:
+        from matplotlib import colormaps
+        cmap = colormaps[name]
+    except ImportError:
+        # matplotlib < 3.5 没有 colormaps 注册表
+        from matplotlib import cm
+        cmap = cm.get_cmap(name)
+    return (cmap(np.linspace(0.0, 1.0, 256))[:, :3] * 255).astype(np.uint8)
+
+# COCO 17个关键点的骨架连线
+SKELETON = [(15, 13), (13, 11), (16, 14), (14, 12), (11, 12), (5, 11), (6, 12), (5, 6), (5, 7),
+            (6, 8), (7, 9), (8, 10), (1, 2), (0, 1), (0, 2), (1, 3), (2, 4), (3, 5), (4, 6)]
+
+def drawPoses(img, boxes, confs, keypoints, confThreshold=0.5):
+    # 没有ultralytics原始结果时（切片推理、回放）自行绘制检测框、关键点和骨架
+    for box, conf, kpts in zip(boxes, confs, keypoints):
+        x1, y1, x2, y2 = (int(v) for v in box)
+        cv2.rectangle(img, (x1, y1), (x2, y2), (255, 56, 56), 2)
+        cv2.putText(img, f"person {conf:.2f}", (x1, y2 + 16), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 56, 56), 1)
+        visible = kpts[:, 2] >= confThreshold
+        for a, b in SKELETON:
+            if a < len(kpts) and b < len(kpts) and visible[a] and visible[b]:
+                cv2.line(img, (int(kpts[a][0]), int(kpts[a][1])), (int(kpts[b][0]), int(kpts[b][1])), (51, 153, 255), 2)
+        for x, y, _ in kpts[visible]:
+            cv2.circle(img, (int(x), int(y)), 4, (0, 255, 0), -1)
+    return img
 
 class ImageProcessor:
-    def __init__(self, imgSize):
+    def __init__(self, imgSize, colormap=HEATMAP_COLORMAP, alpha=HEATMAP_ALPHA):
         self.imgSize = imgSize
+        self.alpha = alpha
+        self.lut = buildColormapLut(colormap)
+        # 叠加在BGR画面上完成，最后一步才转换为RGB，省去一个中间缓冲区
+        self._lutBgr = np.ascontiguousarray(self.lut[:, ::-1])
+        # 复用的中间缓冲区，避免每帧分配大数组
+        self._resized = np.empty((imgSize, imgSize, 3), dtype=np.uint8)
+        self._quantized = np.empty((imgSize, imgSize), dtype=np.uint8)
+        self._heatmapColor = np.empty((imgSize, imgSize, 3), dtype=np.uint8)
+        # 输出缓冲区轮流使用，保证Tk线程读取时不会被推理线程覆盖；
+        # 每像素4字节（RGBX），PIL只能直接映射这类布局，3字节RGB会被悄悄复制一份
+        self._outputs = [np.zeros((imgSize, imgSize, 4), dtype=np.uint8) for _ in range(PIPELINE_QUEUE_SIZE + 3)]
+        # 与输出缓冲区共享内存的PIL图像，显示时不再拷贝
+        self._outputImages = [Image.frombuffer('RGBX', (imgSize, imgSize), output, 'raw', 'RGBX', 0, 1)
+                              for output in self._outputs]
+        self._outputIndex = 0
+        self.photo = None
 
     def processFrame(self, frame, heatmap):
-        frameResized = cv2.resize(frame, (self.imgSize, self.imgSize))
-        img = cv2.cvtColor(frameResized, cv2.COLOR_BGR2RGB)
-        jet = getattr(cm, 'jet', None)
-        if jet is not None:
-            heatmapColor = (jet(heatmap) * 255).astype('uint8')
+        return self.toPhotoImage(self.composeFrame(frame, heatmap))
+
+    def composeFrame(self, frame, heatmap):
+        # 只做numpy运算，可以在工作线程中调用
+        cv2.resize(frame, (self.imgSize, self.imgSize), dst=self._resized)
+        cv2.convertScaleAbs(heatmap, dst=self._quantized, alpha=255)
+        np.take(self._lutBgr, self._quantized, axis=0, out=self._heatmapColor)
+        cv2.addWeighted(self._resized, 1.0, self._heatmapColor, self.alpha, 0, dst=self._resized)
+        output = self._outputs[self._outputIndex]
+        self._outputIndex = (self._outputIndex + 1) % len(self._outputs)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGBA, dst=output)
+        return output
+
+    def toPhotoImage(self, overlay):
+        # PhotoImage 只能在Tk线程中使用；只创建一次，之后每帧原地更新像素
+        imgPil = next((image for output, image in zip(self._outputs, self._outputImages) if output is overlay), None)
+        if imgPil is None:
+            imgPil = Image.fromarray(overlay)
+        if self.photo is None or (self.photo.width(), self.photo.height()) != imgPil.size:
+            self.photo = ImageTk.PhotoImage('RGB', imgPil.size)
+            self.photo.paste(imgPil)
         else:
-            heatmapColor = (cm.get_cmap('jet')(heatmap) * 255).astype('uint8')
-        overlay = cv2.addWeighted(img, 1.0, heatmapColor[:,:,:3], 0.3, 0)
-        imgPil = Image.fromarray(overlay)
-        return ImageTk.PhotoImage(imgPil)
+            self.photo.paste(imgPil)
+        return self.photo
 
     def getResizedFrame(self, frame):
         frameResized = cv2.resize(frame, (self.imgSize, self.imgSize))
@@ -0,0 +1,151 @@
+import numpy as np
+
+ACTION_NAMES = ['Head Down', 'Head Up', 'Lying', 'Raise Hand']
+
+# COCO 17个关键点中用到的索引
+NOSE, LEFT_EYE, RIGHT_EYE = 0, 1, 2
+LEFT_SHOULDER, RIGHT_SHOULDER = 5, 6
+LEFT_ELBOW, RIGHT_ELBOW = 7, 8
+LEFT_WRIST, RIGHT_WRIST = 9, 10
+NUM_KEYPOINTS = 17
+# 规则只用到前11个关键点（到手腕为止），11点的课堂姿态模型也可以直接分类
+NUM_RULE_KEYPOINTS = RIGHT_WRIST + 1
+
+
+class PostureRules:
+    # 姿态分类规则中可调的阈值，长度类阈值均为检测框高度的比例；默认值与原有规则一致
+    def __init__(self, noseMargin=0.0, minFaceVisible=3, lyingMargin=0.2, lyingMaxFace=1,
+                 wristMargin=0.0, wristAboveElbow=False):
+        self.noseMargin = noseMargin  # 鼻子比两侧肩膀低出该比例才算低头
+        self.minFaceVisible = minFaceVisible  # 鼻子和双眼中至少可见几个才算抬头
+        self.lyingMargin = lyingMargin  # 鼻子低于肩膀中点该比例才算趴着
+        self.lyingMaxFace = lyingMaxFace  # 趴着时面部关键点最多可见几个
+        self.wristMargin = wristMargin
+        self.wristAboveElbow = wristAboveElbow  # False 时沿用原规则：手腕低于肘部计为举手
+
+    def replace(self, **changes):
+        params = dict(self.__dict__)
+        params.update(changes)
+        return PostureRules(**params)
+
+    def __repr__(self):
+        return 'PostureRules(' + ', '.join(f'{k}={v!r}' for k, v in self.__dict__.items()) + ')'
+
+
+DEFAULT_RULES = PostureRules()
+
+
+class PostureBatch:
+    # 一帧中所有人的姿态分类结果，全部为长度N的布尔数组
+    def __init__(self, valid, headDown, headUp, lying, raiseHand, keypointCounts, keypointConfSum):
+        self.valid = valid
+        self.headDown = headDown
+        self.headUp = headUp
+        self.lying = lying
+        self.raiseHand = raiseHand
+        self.keypointCounts = keypointCounts  # (K,) 每个关键点可见次数
+        self.keypointConfSum = keypointConfSum  # (K,) 每个关键点置信度之和
+
+    @property
+    def counts(self):
+        return {
+            'Head Down': int(self.headDown.sum()),
+            'Head Up': int(self.headUp.sum()),
+            'Lying': int(self.lying.sum()),
+            'Raise Hand': int(self.raiseHand.sum()),
+        }
+
+    @property
+    def labels(self):
+        # 每个人的头部状态标签，未参与分类的为None
+        labels = np.full(len(self.valid), None, dtype=object)
+        labels[self.headUp] = 'HEAD UP'
+        labels[self.headDown] = 'HEAD DOWN'
+        return labels
+
+
+def _asArrays(keypoints, boxes=None):
+    keypoints = np.asarray(keypoints, dtype=np.float32)
+    if keypoints.ndim != 3:
+        keypoints = keypoints.reshape(-1, NUM_KEYPOINTS, 3)
+    if boxes is None:
+        return keypoints, None
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return keypoints, boxes
+
+
+def keypointStats(keypoints, confThreshold=0.5):
+    # 每个关键点的可见次数和置信度之和
+    kptConf = keypoints[:, :, 2]
+    visible = kptConf >= confThreshold
+    return visible, visible.sum(axis=0), np.where(visible, kptConf, 0.0).sum(axis=0)
+
+
+def classifyPostures(keypoints, boxes, confs, confThreshold=0.5, rules=DEFAULT_RULES):
+    # 一次性对 (N, K, 3) 关键点和 (N, 4) xyxy 检测框做姿态分类
+    keypoints, boxes = _asArrays(keypoints, boxes)
+    confs = np.asarray(confs, dtype=np.float32).reshape(-1)
+    n = len(keypoints)
+    visible, keypointCounts, keypointConfSum = keypointStats(keypoints, confThreshold)
+
+    if n == 0 or keypoints.shape[1] < NUM_RULE_KEYPOINTS:
+        empty = np.zeros(n, dtype=bool)
+        return PostureBatch(empty, empty, empty, empty, empty, keypointCounts, keypointConfSum)
+
+    valid = confs >= confThreshold
+    y = keypoints[:, :, 1]
+    visibleFace = visible[:, [NOSE, LEFT_EYE, RIGHT_EYE]].sum(axis=1)
+    boxHeight = np.trunc(boxes[:, 3]) - np.trunc(boxes[:, 1])
+
+    # 方法1：鼻子低于两侧肩膀视为低头；方法2：面部关键点不全可见视为低头
+    noseY = y[:, NOSE] - boxHeight * rules.noseMargin
+    noseBelowShoulders = (noseY > y[:, LEFT_SHOULDER]) & (noseY > y[:, RIGHT_SHOULDER])
+    faceVisible = visibleFace >= rules.minFaceVisible
+    headDown = valid & (noseBelowShoulders | ~faceVisible)
+    headUp = valid & ~noseBelowShoulders & faceVisible
+
+    # 趴着：鼻子明显低于肩膀中点（默认检测框高度的20%）且面部几乎不可见
+    shoulderMid = (y[:, LEFT_SHOULDER] + y[:, RIGHT_SHOULDER]) / 2
+    lying = valid & (y[:, NOSE] > shoulderMid + boxHeight * rules.lyingMargin) & (visibleFace <= rules.lyingMaxFace)
+
+    # 举手：任一侧手腕可见且与肘部满足位置关系
+    sign = -1.0 if rules.wristAboveElbow else 1.0
+    wristMargin = boxHeight * rules.wristMargin
+    raiseHand = valid & (
+        (visible[:, LEFT_WRIST] & (sign * (y[:, LEFT_WRIST] - y[:, LEFT_ELBOW]) > wristMargin)) |
+        (visible[:, RIGHT_WRIST] & (sign * (y[:, RIGHT_WRIST] - y[:, RIGHT_ELBOW]) > wristMargin))
+    )
+    return PostureBatch(valid, headDown, headUp, lying, raiseHand, keypointCounts, keypointConfSum)
+
+
+def describeFlags(keypoints, confThreshold=0.5):
+    # determine_action 规则的布尔结果 (抬头, 趴着, 举手)，用于与 classifyPostures 的规则对比
+    keypoints, _ = _asArrays(keypoints)
+    y = keypoints[:, :, 1]
+    visible = keypoints[:, :, 2] >= confThreshold
+    visibleFace = visible[:, [NOSE, LEFT_EYE, RIGHT_EYE]].sum(axis=1)
+    noseBelowShoulders = (y[:, NOSE] > y[:, LEFT_SHOULDER]) & (y[:, NOSE] > y[:, RIGHT_SHOULDER])
+    headUp = noseBelowShoulders | (visibleFace == 3)
+
+    shoulderMid = (y[:, LEFT_SHOULDER] + y[:, RIGHT_SHOULDER]) / 2
+    lying = (y[:, NOSE] > shoulderMid + 30) & (visibleFace <= 1)
+    raiseHand = (
+        (visible[:, LEFT_WRIST] & (y[:, LEFT_WRIST] > y[:, LEFT_ELBOW])) |
+        (visible[:, RIGHT_WRIST] & (y[:, RIGHT_WRIST] > y[:, RIGHT_ELBOW]))
+    )
+    return headUp, lying, raiseHand
+
+
+def describePostures(keypoints, confThreshold=0.5):
+    # determine_action 的批量版本，返回每个人的标注文字
+    keypoints, _ = _asArrays(keypoints)
+    n = len(keypoints)
+    if n == 0:
+        return []
+    if keypoints.shape[1] < NUM_RULE_KEYPOINTS:
+        return ["Unknown"] * n
+
+    headUp, lying, raiseHand = describeFlags(keypoints, confThreshold)
+    headStatus = np.where(headUp, 'Head Up', 'Head Down')
+    posture = np.where(lying, 'LYING', np.where(raiseHand, 'RAISE HAND', ''))
+    return [f"{h}, {p}" for h, p in zip(headStatus, posture)]
@@ -0,0 +1,57 @@
+import threading
+import cv2
+from config import DETECT_MIN_INTERVAL, DETECT_MAX_INTERVAL, MOTION_LOW, MOTION_HIGH, MOTION_SIZE
+
+class AdaptiveScheduler:
+    # 根据画面运动量决定多久做一次完整的姿态推理，静止场景间隔拉长，有动作时立即推理
+    def __init__(self, minInterval=DETECT_MIN_INTERVAL, maxInterval=DETECT_MAX_INTERVAL,
+                 motionLow=MOTION_LOW, motionHigh=MOTION_HIGH, motionSize=MOTION_SIZE):
+        self.minInterval = max(1, minInterval)
+        self.maxInterval = max(self.minInterval, maxInterval)
+        self.motionLow = motionLow
+        self.motionHigh = motionHigh
+        self.motionSize = motionSize
+        self.prevGrey = None
+        self.interval = self.minInterval
+        self.sinceDetect = 0
+        self.motion = 0.0
+        self.detections = 0
+        self.propagated = 0
+        # forceDetect 在Tk线程中调用，shouldDetect 在推理线程中读取
+        self._forced = threading.Event()
+
+    def motionScore(self, grey):
+        # 在再次缩小的灰度图上做帧差，返回 0~1 的平均变化量
+        small = cv2.resize(grey, (self.motionSize, self.motionSize), interpolation=cv2.INTER_AREA)
+        if self.prevGrey is None:
+            self.prevGrey = small
+            return 1.0
+        score = float(cv2.absdiff(small, self.prevGrey).mean()) / 255.0
+        self.prevGrey = small
+        return score
+
+    def _intervalFor(self, motion):
+        if motion >= self.motionHigh:
+            return self.minInterval
+        if motion <= self.motionLow:
+            return self.maxInterval
+        ratio = (motion - self.motionLow) / (self.motionHigh - self.motionLow)
+        return int(round(self.maxInterval - ratio * (self.maxInterval - self.minInterval)))
+
+    def shouldDetect(self, grey):
+        self.motion = self.motionScore(grey)
+        self.interval = self._intervalFor(self.motion)
+        self.sinceDetect += 1
+        forced = self._forced.is_set()
+        if forced:
+            self._forced.clear()
+        if forced or self.sinceDetect >= self.interval:
+            self.sinceDetect = 0
+            self.detections += 1
+            return True
+        self.propagated += 1
+        return False
+
+    def forceDetect(self):
+        # 下一帧强制完整推理（例如没有可沿用的结果时），不受下一帧重新计算的间隔影响
+        self._forced.set()
@@ -0,0 +1,151 @@
+import threading
+import time
+from typing import NamedTuple
+import numpy as np
+from config import STATS_WINDOWS, STATS_HISTORY_SIZE
+from detection.posture import ACTION_NAMES
+
+SESSION = 'session'
+
+
+class StatsSnapshot(NamedTuple):
+    # 某个时间窗口内的统计数值（不含任何格式化字符串）
+    window: str
+    seconds: float  # 窗口实际覆盖的时长
+    frames: int
+    personCount: int  # 最新一帧的人数
+    actionCounts: np.ndarray  # (A,) 最新一帧各动作人数，顺序同 ACTION_NAMES
+    meanPersons: float  # 窗口内平均每帧人数
+    meanActions: np.ndarray  # (A,) 窗口内平均每帧各动作人数
+    meanConfidence: float  # 窗口内每个检测框的平均置信度
+    keypointCounts: np.ndarray  # (K,) 窗口内各关键点可见次数
+    keypointMeanConf: np.ndarray  # (K,) 窗口内各关键点平均置信度
+
+    def action(self, name, mean=False):
+        index = ACTION_NAMES.index(name)
+        return float(self.meanActions[index]) if mean else int(self.actionCounts[index])
+
+
+class DetectionStats:
+    # 检测统计：每帧一行定长数值写入环形缓冲区，累计值和各滑动窗口的和随写入增量更新，读取时O(1)
+    # 行布局：[人数, 置信度之和, 各动作人数(A), 各关键点可见次数(K), 各关键点置信度之和(K)]
+    def __init__(self, numKeypoints, windows=STATS_WINDOWS, historySize=STATS_HISTORY_SIZE):
+        self.numKeypoints = numKeypoints
+        self.numActions = len(ACTION_NAMES)
+        self.windows = dict(windows)
+        self.historySize = historySize
+        self.width = 2 + self.numActions + 2 * numKeypoints
+        self._kptStart = 2 + self.numActions
+        self.history = np.zeros((historySize, self.width), dtype=np.float64)
+        self.times = np.zeros(historySize, dtype=np.float64)
+        # 推理线程写入，Tk线程（导出后清零）和网页服务读取，三者共用一把锁
+        self._lock = threading.Lock()
+        self._reset()
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self.head = 0
+        self.sessionFrames = 0
+        self.startTime = None
+        self.lastTime = None
+        self.sums = {name: np.zeros(self.width, dtype=np.float64) for name in [SESSION, *self.windows]}
+        self.tails = {name: 0 for name in self.windows}
+
+    def update(self, timestamp, confs, posture):
+        # posture 为 PostureBatch；全部写入预分配的数组，不创建字典或字符串
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._update(timestamp, confs, posture)
+
+    def _update(self, timestamp, confs, posture):
+        slot = self.head % self.historySize
+        # 环形缓冲区写满时，被覆盖的行先从仍包含它的窗口中移除
+        oldest = self.head - self.historySize
+        for name in self.windows:
+            if self.tails[name] <= oldest:
+                self.sums[name] -= self.history[slot]
+                self.tails[name] = oldest + 1
+        row = self.history[slot]
+        row[0] = len(confs)
+        row[1] = confs.sum()
+        row[2] = posture.headDown.sum()
+        row[3] = posture.headUp.sum()
+        row[4] = posture.lying.sum()
+        row[5] = posture.raiseHand.sum()
+        k = min(self.numKeypoints, len(posture.keypointCounts))
+        kpt = self._kptStart
+        row[kpt:kpt + self.numKeypoints] = 0
+        row[kpt + self.numKeypoints:] = 0
+        row[kpt:kpt + k] = posture.keypointCounts[:k]
+        row[kpt + self.numKeypoints:kpt + self.numKeypoints + k] = posture.keypointConfSum[:k]
+        self.times[slot] = timestamp
+        self.head += 1
+        self.sessionFrames += 1
+        if self.startTime is None:
+            self.startTime = timestamp
+        self.lastTime = timestamp
+
+        self.sums[SESSION] += row
+        for name, seconds in self.windows.items():
+            sums = self.sums[name]
+            sums += row
+            tail = self.tails[name]
+            while tail < self.head - 1 and self.times[tail % self.historySize] < timestamp - seconds:
+                sums -= self.history[tail % self.historySize]
+                tail += 1
+            self.tails[name] = tail
+
+    def snapshot(self, window=SESSION):
+        with self._lock:
+            return self._snapshot(window)
+
+    def _snapshot(self, window):
+        sums = self.sums[window]
+        if window == SESSION:
+            frames = self.sessionFrames
+            first = self.startTime
+        else:
+            frames = self.head - self.tails[window]
+            first = self.times[self.tails[window] % self.historySize] if frames else None
+        latest = self.history[(self.head - 1) % self.historySize] if self.head else np.zeros(self.width)
+        kpt = self._kptStart
+        K = self.numKeypoints
+        kptCounts = sums[kpt:kpt + K]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            kptMeanConf = np.where(kptCounts > 0, sums[kpt + K:] / kptCounts, 0.0)
+        perFrame = max(frames, 1)
+        return StatsSnapshot(
+            window=window,
+            seconds=(self.lastTime - first) if frames and first is not None else 0.0,
+            frames=int(frames),
+            personCount=int(latest[0]),
+            actionCounts=latest[2:kpt].astype(np.int64),
+            meanPersons=float(sums[0] / perFrame),
+            meanActions=sums[2:kpt] / perFrame,
+            meanConfidence=float(sums[1] / sums[0]) if sums[0] > 0 else 0.0,
+            keypointCounts=kptCounts.astype(np.int64),
+            keypointMeanConf=kptMeanConf,
+        )
+
+    def snapshots(self):
+        # 所有窗口的快照，推理线程中生成后交给Tk线程显示
+        with self._lock:
+            return {name: self._snapshot(name) for name in [SESSION, *self.windows]}
+
+
+def formatClassStats(snapshot, keypointNames):
+    # 只在显示时格式化：与原 get_class_stats 相同的列表结构
+    stats = []
+    if snapshot.personCount > 0:
+        stats.append({'class': 'Person', 'count': snapshot.personCount,
+                      'avg_confidence': f"{snapshot.meanConfidence:.3f}"})
+    for action, count in zip(ACTION_NAMES, snapshot.actionCounts):
+        if count > 0:
+            stats.append({'class': action, 'count': int(count), 'avg_confidence': 'N/A'})
+    for name, count, conf in zip(keypointNames, snapshot.keypointCounts, snapshot.keypointMeanConf):
+        if count > 0:
+            stats.append({'class': name, 'count': int(count), 'avg_confidence': f"{conf:.3f}"})
+    return stats
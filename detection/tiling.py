@@ -0,0 +1,113 @@
+import json
+import math
+import os
+import numpy as np
+from config import (TILE_SIZE, TILE_OVERLAP, TILE_NMS_IOU, TILE_INCLUDE_FULL_FRAME,
+                    TILE_ROIS, TILE_LAYOUT_CACHE)
+from detection.tracker import iouMatrix
+
+
+def gridTiles(width, height, tileSize=TILE_SIZE, overlap=TILE_OVERLAP):
+    # 生成覆盖整幅画面、相互重叠的切片，返回 (T, 4) xyxy
+    def starts(length):
+        if length <= tileSize:
+            return np.array([0])
+        step = tileSize * (1 - overlap)
+        count = math.ceil((length - tileSize) / step) + 1
+        return np.linspace(0, length - tileSize, count).astype(np.int64)
+    xs, ys = np.meshgrid(starts(width), starts(height))
+    x0, y0 = xs.ravel(), ys.ravel()
+    return np.column_stack([x0, y0, np.minimum(x0 + tileSize, width), np.minimum(y0 + tileSize, height)])
+
+
+def nms(boxes, scores, iouThreshold=TILE_NMS_IOU):
+    # 按置信度从高到低保留检测框，去掉与已保留框重叠过多的框
+    order = np.argsort(-scores)
+    keep = []
+    while len(order):
+        best = order[0]
+        keep.append(best)
+        if len(order) == 1:
+            break
+        overlap = iouMatrix(boxes[best][None], boxes[order[1:]])[0]
+        order = order[1:][overlap < iouThreshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class TileLayoutCache:
+    # 每路摄像头的切片布局：配置了座位区域时总是直接使用（修改配置立即生效），否则按画面尺寸生成网格；
+    # 只有生成的网格会持久化，缓存键包含切片大小和重叠比例
+    def __init__(self, path=TILE_LAYOUT_CACHE, rois=TILE_ROIS, tileSize=TILE_SIZE, overlap=TILE_OVERLAP):
+        self.path = path
+        self.rois = rois
+        self.tileSize = tileSize
+        self.overlap = overlap
+        self.layouts = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.layouts = {key: np.array(tiles, dtype=np.int64) for key, tiles in json.load(f).items()}
+            except (OSError, ValueError) as e:
+                print(f"Error loading tile layouts: {e}")
+
+    def get(self, cameraKey, width, height):
+        if cameraKey in self.rois:
+            return np.array(self.rois[cameraKey], dtype=np.int64).reshape(-1, 4)
+        key = f'{cameraKey}@{width}x{height}/{self.tileSize}/{self.overlap:g}'
+        layout = self.layouts.get(key)
+        if layout is None:
+            layout = gridTiles(width, height, self.tileSize, self.overlap)
+            self.layouts[key] = layout
+            self.save()
+        return layout
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({key: tiles.tolist() for key, tiles in self.layouts.items()}, f, indent=2)
+        except OSError as e:
+            print(f"Error saving tile layouts: {e}")
+
+
+class TiledInference:
+    # 高分辨率画面切片后一次批量推理，坐标映射回原图并做跨切片NMS
+    def __init__(self, model, cameraKey='default', layouts=None, includeFullFrame=TILE_INCLUDE_FULL_FRAME):
+        self.model = model
+        self.cameraKey = str(cameraKey)
+        self.layouts = layouts if layouts is not None else TileLayoutCache()
+        self.includeFullFrame = includeFullFrame
+
+    def __call__(self, frame):
+        height, width = frame.shape[:2]
+        tiles = self.layouts.get(self.cameraKey, width, height)
+        crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles]
+        offsets = [(x0, y0) for x0, y0, _, _ in tiles]
+        if self.includeFullFrame and len(tiles) > 1:
+            # 整幅画面也参与推理，用于检测靠近镜头、跨越多个切片的学生
+            crops.append(frame)
+            offsets.append((0, 0))
+        results = self.model(crops, verbose=False)
+
+        allBoxes, allConfs, allKeypoints = [], [], []
+        for (x0, y0), result in zip(offsets, results):
+            if result.keypoints is None or len(result.boxes) == 0:
+                continue
+            boxes = result.boxes.xyxy.cpu().numpy()
+            keypoints = result.keypoints.data.cpu().numpy()[:len(boxes)]
+            boxes[:, [0, 2]] += x0
+            boxes[:, [1, 3]] += y0
+            keypoints[:, :, 0] += x0
+            keypoints[:, :, 1] += y0
+            allBoxes.append(boxes)
+            allConfs.append(result.boxes.conf.cpu().numpy())
+            allKeypoints.append(keypoints)
+        if not allBoxes:
+            return (np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32),
+                    np.zeros((0, 17, 3), dtype=np.float32))
+        boxes = np.concatenate(allBoxes)
+        confs = np.concatenate(allConfs)
+        keypoints = np.concatenate(allKeypoints)
+        keep = nms(boxes, confs)
+        return boxes[keep], confs[keep], keypoints[keep]
@@ -0,0 +1,158 @@
+import numpy as np
+from config import TRACK_IOU_THRESHOLD, TRACK_MAX_MISSES, TRACK_HYSTERESIS, TRACK_MOVE_THRESHOLD
+from detection.posture import PostureBatch, classifyPostures, keypointStats
+
+# 每条轨迹的四个状态列，顺序与 ACTION_NAMES 一致
+HEAD_DOWN, HEAD_UP, LYING, RAISE_HAND = range(4)
+
+
+def iouMatrix(boxesA, boxesB):
+    # (N, 4) 与 (M, 4) xyxy 检测框两两之间的IoU，返回 (N, M)
+    a = boxesA[:, None, :]
+    b = boxesB[None, :, :]
+    interW = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    interH = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = interW * interH
+    areaA = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    areaB = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(areaA + areaB - inter, 1e-6)
+
+
+def greedyMatch(cost, threshold):
+    # 按IoU从大到小贪心匹配，返回每行对应的列（未匹配为-1）
+    n, m = cost.shape
+    rowMatch = np.full(n, -1, dtype=np.int64)
+    if n == 0 or m == 0:
+        return rowMatch
+    cost = cost.copy()
+    for _ in range(min(n, m)):
+        index = int(np.argmax(cost))
+        row, col = divmod(index, m)
+        if cost[row, col] < threshold:
+            break
+        rowMatch[row] = col
+        cost[row, :] = -1
+        cost[:, col] = -1
+    return rowMatch
+
+
+class PostureTracker:
+    # 轻量多目标跟踪：IoU关联得到持久ID，每条轨迹的姿态状态带迟滞，避免逐帧闪烁
+    def __init__(self, iouThreshold=TRACK_IOU_THRESHOLD, maxMisses=TRACK_MAX_MISSES,
+                 hysteresis=TRACK_HYSTERESIS, moveThreshold=TRACK_MOVE_THRESHOLD):
+        self.iouThreshold = iouThreshold
+        self.maxMisses = maxMisses
+        self.hysteresis = hysteresis
+        self.moveThreshold = moveThreshold
+        self.nextId = 0
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.refKeypoints = np.zeros((0, 17, 3), dtype=np.float32)
+        self.raw = np.zeros((0, 5), dtype=bool)  # 最近一次分类结果：4个状态 + valid
+        self.smoothed = np.zeros((0, 4), dtype=bool)
+        self.pending = np.zeros((0, 4), dtype=np.int32)
+        self.misses = np.zeros(0, dtype=np.int32)
+        # 各状态的进入次数（按平滑后的状态统计）
+        self.events = np.zeros(4, dtype=np.int64)
+        self.skipped = 0
+
+    def reset(self):
+        self.__init__(self.iouThreshold, self.maxMisses, self.hysteresis, self.moveThreshold)
+
+    def resetCounters(self):
+        # 只清零累计事件和跳过次数，保留现有轨迹，避免清零后在场的人被重新计为新事件
+        self.events = np.zeros(4, dtype=np.int64)
+        self.skipped = 0
+
+    def _moved(self, keypoints, boxes, trackIndex, confThreshold):
+        # 关键点位移（相对检测框高度）超过阈值的才需要重新分类
+        ref = self.refKeypoints[trackIndex]
+        visible = (keypoints[:, :, 2] >= confThreshold) & (ref[:, :, 2] >= confThreshold)
+        shift = np.abs(keypoints[:, :, :2] - ref[:, :, :2]).max(axis=2)
+        shift = np.where(visible, shift, 0.0).max(axis=1)
+        height = np.maximum(boxes[:, 3] - boxes[:, 1], 1.0)
+        visibilityChanged = ((keypoints[:, :, 2] >= confThreshold) != (ref[:, :, 2] >= confThreshold)).any(axis=1)
+        return (shift / height > self.moveThreshold) | visibilityChanged
+
+    def update(self, boxes, keypoints, confs, confThreshold=0.5):
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        keypoints = np.asarray(keypoints, dtype=np.float32)
+        if keypoints.ndim != 3:
+            keypoints = keypoints.reshape(len(boxes), -1, 3)
+        confs = np.asarray(confs, dtype=np.float32).reshape(-1)
+        n = len(boxes)
+        if len(self.ids) == 0 and self.refKeypoints.shape[1] != keypoints.shape[1]:
+            self.refKeypoints = np.zeros((0, keypoints.shape[1], 3), dtype=np.float32)
+
+        detTrack = greedyMatch(iouMatrix(boxes, self.boxes), self.iouThreshold)
+        matched = detTrack >= 0
+
+        # 未移动的已匹配目标直接沿用轨迹上次的分类结果
+        reclassify = np.ones(n, dtype=bool)
+        if matched.any():
+            reclassify[matched] = self._moved(keypoints[matched], boxes[matched], detTrack[matched], confThreshold)
+        raw = np.zeros((n, 5), dtype=bool)
+        raw[~reclassify] = self.raw[detTrack[~reclassify]]
+        if reclassify.any():
+            batch = classifyPostures(keypoints[reclassify], boxes[reclassify], confs[reclassify], confThreshold)
+            raw[reclassify] = np.column_stack([batch.headDown, batch.headUp, batch.lying, batch.raiseHand, batch.valid])
+        self.skipped += int(n - reclassify.sum())
+
+        # 已匹配轨迹：状态与新观测不一致的帧数达到迟滞阈值才切换
+        trackIndex = detTrack[matched]
+        observed = raw[matched, :4]
+        differ = observed != self.smoothed[trackIndex]
+        pending = np.where(differ, self.pending[trackIndex] + 1, 0)
+        flip = pending >= self.hysteresis
+        smoothed = self.smoothed[trackIndex] ^ flip
+        self.events += (flip & smoothed).sum(axis=0)
+        pending[flip] = 0
+        self.smoothed[trackIndex] = smoothed
+        self.pending[trackIndex] = pending
+        self.boxes[trackIndex] = boxes[matched]
+        self.raw[trackIndex] = raw[matched]
+        self.misses[trackIndex] = 0
+        refreshed = trackIndex[reclassify[matched]]
+        self.refKeypoints[refreshed] = keypoints[matched & reclassify]
+
+        # 未匹配的轨迹累计丢失次数，超过上限后删除
+        unmatchedTracks = np.ones(len(self.ids), dtype=bool)
+        unmatchedTracks[trackIndex] = False
+        self.misses[unmatchedTracks] += 1
+
+        # 新目标直接采用本帧分类结果作为初始状态
+        newDets = np.flatnonzero(~matched)
+        newIds = np.arange(self.nextId, self.nextId + len(newDets), dtype=np.int64)
+        self.nextId += len(newDets)
+        detTrack[newDets] = len(self.ids) + np.arange(len(newDets))
+        self.events += raw[newDets, :4].sum(axis=0)
+        self.ids = np.concatenate([self.ids, newIds])
+        self.boxes = np.concatenate([self.boxes, boxes[newDets]])
+        self.refKeypoints = np.concatenate([self.refKeypoints, keypoints[newDets]])
+        self.raw = np.concatenate([self.raw, raw[newDets]])
+        self.smoothed = np.concatenate([self.smoothed, raw[newDets, :4]])
+        self.pending = np.concatenate([self.pending, np.zeros((len(newDets), 4), dtype=np.int32)])
+        self.misses = np.concatenate([self.misses, np.zeros(len(newDets), dtype=np.int32)])
+
+        trackIds = self.ids[detTrack]
+        states = self.smoothed[detTrack]
+        valid = self.raw[detTrack, 4]
+        self._prune()
+
+        _, keypointCounts, keypointConfSum = keypointStats(keypoints, confThreshold)
+        headDown = states[:, HEAD_DOWN]
+        posture = PostureBatch(valid, headDown, states[:, HEAD_UP] & ~headDown, states[:, LYING],
+                               states[:, RAISE_HAND], keypointCounts, keypointConfSum)
+        return posture, trackIds
+
+    def _prune(self):
+        keep = self.misses <= self.maxMisses
+        if keep.all():
+            return
+        self.ids = self.ids[keep]
+        self.boxes = self.boxes[keep]
+        self.refKeypoints = self.refKeypoints[keep]
+        self.raw = self.raw[keep]
+        self.smoothed = self.smoothed[keep]
+        self.pending = self.pending[keep]
+        self.misses = self.misses[keep]
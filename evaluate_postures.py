@@ -0,0 +1,63 @@
+import argparse
+import json
+import time
+
+from detection.evaluation import compareRuleSets, evaluateRules, loadKeypointDump, mergeDumps, parseGrid, sweep
+from detection.posture import DEFAULT_RULES
+
+LABELS = {'headDown': '低头', 'headUp': '抬头', 'lying': '趴着', 'raiseHand': '举手'}
+
+
+def printEvaluation(result):
+    for key, label in LABELS.items():
+        if key not in result:
+            continue
+        r = result[key]
+        (tn, fp), (fn, tp) = r['confusion']
+        print(f"{label}: P={r['precision']:.3f} R={r['recall']:.3f} F1={r['f1']:.3f}  TP={tp} FP={fp} FN={fn} TN={tn}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线批量评估姿态分类规则，并对规则阈值做网格搜索')
+    parser.add_argument('dumps', nargs='+', help='Keypoint dumps (.npz) or YOLO predict label folders')
+    parser.add_argument('--truth', help='Ground-truth .npz for a predict folder (headDown/headUp/lying/raiseHand)')
+    parser.add_argument('--image_size', type=int, nargs=2, metavar=('W', 'H'), help='Scale normalized predict output')
+    parser.add_argument('--conf', type=float, default=0.5, help='Confidence threshold for the baseline evaluation')
+    parser.add_argument('--grid', nargs='*', default=[],
+                        help='Parameter grid, e.g. lyingMargin=0.1,0.2,0.3 noseMargin=-0.05,0,0.05 confThreshold=0.3,0.5')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for the sweep')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output', help='Write all results as JSON')
+    args = parser.parse_args()
+
+    began = time.time()
+    data = mergeDumps([loadKeypointDump(path, args.truth, args.image_size) for path in args.dumps])
+    print(f"{len(data['keypoints'])} persons loaded in {time.time() - began:.2f}s")
+
+    report = {'baseline': {'rules': repr(DEFAULT_RULES), 'confThreshold': args.conf}}
+    report['ruleAgreement'] = compareRuleSets(data, DEFAULT_RULES, args.conf)
+    print("统计规则与标注文字规则的一致率：" + "  ".join(
+        f"{LABELS[key]} {value['agreement'] * 100:.1f}%" for key, value in report['ruleAgreement'].items()))
+
+    if data['truth']:
+        report['baseline'].update(evaluateRules(data, DEFAULT_RULES, args.conf))
+        print("当前规则：")
+        printEvaluation(report['baseline'])
+
+    if args.grid:
+        grid = parseGrid(args.grid)
+        began = time.time()
+        results = sweep(data, grid, args.workers)
+        print(f"网格搜索 {len(grid)} 组参数，耗时 {time.time() - began:.2f}s")
+        for params, result in results[:args.top]:
+            print(f"meanF1={result['meanF1']:.4f}  {params}")
+        report['sweep'] = [{'params': params, **result} for params, result in results]
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ 结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
+import argparse
 from controller import MainController
+from config import WEB_SERVER_ENABLED
 
 def main():
-    controller = MainController()
+    parser = argparse.ArgumentParser(description='智瞳课堂——课堂活跃度实时监测系统')
+    parser.add_argument('--replay', help='Replay a recorded keypoint log (.kpi) instead of the camera')
+    parser.add_argument('--serve', action='store_true', help='Also serve metrics (JSON/WebSocket) and an MJPEG stream over HTTP')
+    args = parser.parse_args()
+    controller = MainController(replayPath=args.replay, serve=args.serve or WEB_SERVER_ENABLED)
     controller.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
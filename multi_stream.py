@@ -0,0 +1,173 @@
+import argparse
+import math
+import os
+import time
+
+import cv2
+
+from config import (MODEL_PATH, STREAM_SOURCES, STREAM_TICK_SECONDS, STREAM_INFERENCE_BUDGET,
+                    STREAM_MAX_INTERVAL, STREAM_MAX_BATCH, STREAM_HEATMAP_SIZE,
+                    STREAM_EXPORT_INTERVAL, STREAM_LOG_INTERVAL, WEB_SERVER_ENABLED)
+from detection.backends import loadModel
+from detection.image_processor import ImageProcessor, drawPoses
+from detection.yolo_detector import YOLODetector
+from utils.data_processor import DataProcessor, HeatmapProcessor, StatusVar, computeRates
+from utils.exporter import ExportWorker
+from utils.pipeline import LatestFrameGrabber
+from utils.web_server import WebServer, buildMetrics
+
+
+class StreamState:
+    # 单路教室视频流：独立的采集线程、检测统计、热力图和数据记录
+    def __init__(self, name, source, total, model, webServer=None):
+        self.name = name
+        self.source = source
+        self.total = total
+        self.cap = cv2.VideoCapture(source)
+        # 视频文件按自身帧率播放并在结尾停止；摄像头和网络流仍全速读取最新帧
+        frameInterval = 0.0
+        if isinstance(source, str) and os.path.isfile(source):
+            frameInterval = 1.0 / (self.cap.get(cv2.CAP_PROP_FPS) or 25.0)
+        self.grabber = LatestFrameGrabber(self.cap, frameInterval)
+        self.detector = YOLODetector(MODEL_PATH, model=model, tiling=False)
+        self.heatmapProcessor = HeatmapProcessor(STREAM_HEATMAP_SIZE)
+        self.imageProcessor = ImageProcessor(STREAM_HEATMAP_SIZE)
+        self.dataProcessor = DataProcessor(name=name)
+        self.status = StatusVar(f"[{name}] ")
+        self.startTime = time.time()
+        self.nextTick = 0
+        self.processed = 0
+        self.lastRates = (0, 0, 0)
+        self.webServer = webServer
+
+    def start(self):
+        if not self.cap.isOpened():
+            print(f"[{self.name}] 无法打开视频源：{self.source}")
+        self.grabber.start()
+
+    def stop(self):
+        self.grabber.stop()
+        self.cap.release()
+        self.dataProcessor.close()
+
+    def consume(self, frame, timestamp, result):
+        frameResult = self.detector.fromResult(frame, result)
+        # 每帧只累加热力值，有人观看画面时才生成热力图
+        self.heatmapProcessor.accumulate(frameResult.scaledRects(STREAM_HEATMAP_SIZE, STREAM_HEATMAP_SIZE))
+        counts = frameResult.actionCounts
+        self.lastRates = computeRates(counts, frameResult.personCount, self.total)
+        self.dataProcessor.updateData(timestamp - self.startTime, self.lastRates[0], frameResult.personCount,
+                                      counts['Head Up'], counts['Head Down'], counts['Lying'], counts['Raise Hand'],
+                                      self.total)
+        self.processed += 1
+        if self.webServer is not None:
+            # 只有有人观看画面时才绘制关键点并叠加热力图
+            overlay = None
+            if self.webServer.wantsFrames(self.name):
+                annotated = drawPoses(frame.copy(), frameResult.boxes, frameResult.confs, frameResult.keypoints)
+                overlay = self.imageProcessor.composeFrame(annotated, self.heatmapProcessor.getHeatmap())
+            self.webServer.publish(self.name, buildMetrics(timestamp, self.total, frameResult.personCount, counts,
+                                                           self.lastRates, self.detector.stats.snapshots()),
+                                   overlay, rgb=True)
+
+    def export(self):
+        self.dataProcessor.exportData(self.total, self.status, name=self.name)
+
+
+class MultiStreamServer:
+    # 多路视频流共享一个模型，每个周期把所有到期的帧打包成一次批量推理
+    def __init__(self, sources, webServer=None):
+        self.model = loadModel(MODEL_PATH)
+        self.webServer = webServer
+        # 运行期间的定时导出交给后台线程增量追加，避免磁盘读写阻塞批量推理
+        self.exportWorker = ExportWorker(print)
+        self.streams = [StreamState(s.get('name', f'stream-{i}'), s['source'], s.get('total', 0), self.model, webServer)
+                        for i, s in enumerate(sources)]
+        self.interval = 1
+        self.frameCost = 0.0
+        self.tick = 0
+        self._running = False
+
+    def _adaptInterval(self, batchSize, elapsed):
+        # 用单帧推理耗时的滑动平均估算每个周期能处理的帧数，据此统一调整各路的采样间隔
+        cost = elapsed / batchSize
+        self.frameCost = cost if self.frameCost == 0 else 0.8 * self.frameCost + 0.2 * cost
+        capacity = max(1.0, STREAM_INFERENCE_BUDGET / self.frameCost)
+        self.interval = min(STREAM_MAX_INTERVAL, max(1, math.ceil(len(self.streams) / capacity)))
+
+    def step(self):
+        due = []
+        for index, stream in enumerate(self.streams):
+            if self.tick < stream.nextTick:
+                continue
+            frame, timestamp = stream.grabber.read(timeout=0)
+            if frame is None:
+                continue
+            # 错开各路的下次采样时间，使每个周期的批量大小保持均匀
+            stream.nextTick = self.tick + self.interval - (index + self.tick) % self.interval
+            due.append((stream, frame, timestamp))
+        for start in range(0, len(due), STREAM_MAX_BATCH):
+            batch = due[start:start + STREAM_MAX_BATCH]
+            began = time.perf_counter()
+            results = self.model([frame for _, frame, _ in batch], verbose=False)
+            self._adaptInterval(len(batch), time.perf_counter() - began)
+            for (stream, frame, timestamp), result in zip(batch, results):
+                stream.consume(frame, timestamp, result)
+        self.tick += 1
+
+    def logStatus(self):
+        for stream in self.streams:
+            headUpRate, handUpRate, headDownLyingRate = stream.lastRates
+            print(f"[{stream.name}] 抬头率：{headUpRate:.1f}%  举手率：{handUpRate:.1f}%  "
+                  f"低头+趴卧率：{headDownLyingRate:.1f}%  已处理：{stream.processed}帧  "
+                  f"采样间隔：{self.interval}  采集丢帧：{stream.grabber.dropped}")
+
+    def run(self):
+        for stream in self.streams:
+            stream.start()
+        self._running = True
+        lastExport = lastLog = time.time()
+        try:
+            while self._running:
+                began = time.time()
+                self.step()
+                if all(stream.grabber.exhausted for stream in self.streams):
+                    print("所有视频源均已结束")
+                    break
+                if began - lastLog >= STREAM_LOG_INTERVAL:
+                    self.logStatus()
+                    lastLog = began
+                if began - lastExport >= STREAM_EXPORT_INTERVAL:
+                    for stream in self.streams:
+                        self.exportWorker.appendRolling(stream.dataProcessor, stream.total, name=stream.name)
+                    lastExport = began
+                time.sleep(max(0.0, STREAM_TICK_SECONDS - (time.time() - began)))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # 等待排队中的增量导出完成，退出时再同步导出完整数据
+            self.exportWorker.stop()
+            for stream in self.streams:
+                stream.export()
+                stream.stop()
+            if self.webServer is not None:
+                self.webServer.stop()
+
+    def stop(self):
+        self._running = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多路教室无界面监测')
+    parser.add_argument('--serve', action='store_true', help='Serve metrics (JSON/WebSocket) and MJPEG streams over HTTP')
+    args = parser.parse_args()
+    webServer = None
+    if args.serve or WEB_SERVER_ENABLED:
+        webServer = WebServer()
+        webServer.start()
+    server = MultiStreamServer(STREAM_SOURCES, webServer)
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
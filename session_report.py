@@ -0,0 +1,53 @@
+import argparse
+import os
+import time
+import numpy as np
+
+from config import EXPORT_DIR, ANALYTICS_THRESHOLD, ANALYTICS_BUCKET_SECONDS
+from utils.analytics import SessionArchive
+
+
+def writeSummary(filepath, archive, summary):
+    # 优先用 pandas 输出（附带文件名、教室、开始时间），没有 pandas 时直接写数值列
+    try:
+        archive.toDataFrame(summary).to_csv(filepath, index=False, encoding='utf-8-sig')
+    except ImportError:
+        np.savetxt(filepath, np.column_stack([summary[name] for name in summary.dtype.names]),
+                   delimiter=',', header=','.join(summary.dtype.names), comments='', fmt='%.3f')
+
+
+def printSessions(archive, summary):
+    print(f"{'会话':<36}{'时长(分)':>9}{'平均抬头率':>11}{'中位数':>8}{'低于阈值':>10}{'举手/分':>9}")
+    for row in summary:
+        name = os.path.basename(archive.sessions[row['session']]['path'])
+        print(f"{name:<36}{row['duration'] / 60:>9.1f}{row['meanRate']:>11.1f}{row['p50Rate']:>8.1f}"
+              f"{row['belowRatio'] * 100:>9.0f}%{row['handPerMinute']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='汇总分析历史会话导出数据（抬头率、低于阈值时长、举手频率）')
+    parser.add_argument('paths', nargs='*', default=[EXPORT_DIR], help='Export files or directories (csv/parquet/feather/bin)')
+    parser.add_argument('--threshold', type=float, default=ANALYTICS_THRESHOLD, help='Head-up rate threshold (%%)')
+    parser.add_argument('--bucket', type=float, default=ANALYTICS_BUCKET_SECONDS, help='Bucket length in seconds')
+    parser.add_argument('--out_dir', default=None, help='Write session and bucket summaries as CSV to this directory')
+    args = parser.parse_args()
+
+    began = time.time()
+    archive = SessionArchive(args.paths)
+    if not archive.sessions:
+        print("没有找到会话数据")
+        return
+    sessions = archive.sessionSummary(args.threshold)
+    buckets = archive.bucketSummary(args.bucket, args.threshold)
+    printSessions(archive, sessions)
+    print(f"✅ {len(archive.sessions)}个会话，{int(sessions['rows'].sum())}行，{len(buckets)}个时间段，"
+          f"耗时{time.time() - began:.2f}秒")
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        writeSummary(os.path.join(args.out_dir, 'session_summary.csv'), archive, sessions)
+        writeSummary(os.path.join(args.out_dir, 'bucket_summary.csv'), archive, buckets)
+        print(f"✅ 汇总结果已写入 {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+
+TRAIN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'train')
+sys.path.insert(0, TRAIN_DIR)
+
+from convert_labelme_to_yolo_pose import convert_labelme_to_yolo, group_persons, keypoints_order
+
+SAMPLE = os.path.join(os.path.dirname(TRAIN_DIR), 'static', 'dataset',
+                      'Snapshot_20240321_63_JPG.rf.1bea526faeaa7e82699c4a8bc52d4f5c.json')
+
+
+def test_sample_splits_ungrouped_students(tmp_path):
+    # 示例标注中约39名学生的关键点都没有 group_id，不能合并成一个人
+    with open(SAMPLE, encoding='utf-8') as f:
+        shapes = json.load(f)['shapes']
+    status, _, persons, message = convert_labelme_to_yolo(SAMPLE, str(tmp_path), str(tmp_path), force=True)
+    assert status == 'converted', message
+    assert 39 <= persons <= 42
+
+    lines = (tmp_path / (os.path.basename(SAMPLE)[:-5] + '.txt')).read_text().splitlines()
+    assert len(lines) == persons
+    visible = 0
+    for line in lines:
+        values = line.split()
+        assert len(values) == 5 + 3 * len(keypoints_order)
+        visible += sum(v == '2' for v in values[7::3])
+        # 每个人的检测框不应横跨多名学生
+        assert float(values[3]) < 0.2
+    # 所有关键点都要保留下来，不能因为标签重复而被覆盖
+    assert visible == len(shapes)
+
+
+def test_duplicate_label_in_group_fails():
+    shapes = [{'label': 'Nose', 'points': [[10, 10]], 'group_id': 1},
+              {'label': 'Nose', 'points': [[50, 50]], 'group_id': 1}]
+    try:
+        group_persons(shapes, 100)
+    except ValueError:
+        return
+    raise AssertionError('duplicate keypoint labels must raise')
+
+
+def test_repeated_label_starts_new_person():
+    shapes = [{'label': 'Nose', 'points': [[10, 10]], 'group_id': None},
+              {'label': 'Left Eye', 'points': [[12, 8]], 'group_id': None},
+              {'label': 'Nose', 'points': [[15, 10]], 'group_id': None}]
+    assert len(group_persons(shapes, 100)) == 2
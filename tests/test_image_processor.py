@@ -0,0 +1,27 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+pytest.importorskip('PIL.ImageTk')
+
+from detection.image_processor import ImageProcessor
+
+
+def test_output_images_share_memory_with_buffers():
+    # 修改输出缓冲区后，对应的PIL图像必须同步变化（否则界面会一直显示初始画面）
+    processor = ImageProcessor(16)
+    output, image = processor._outputs[0], processor._outputImages[0]
+    output[..., :3] = (10, 20, 30)
+    assert image.getpixel((0, 0))[:3] == (10, 20, 30)
+    output[5, 7, :3] = (200, 100, 50)
+    assert image.getpixel((7, 5))[:3] == (200, 100, 50)
+
+
+def test_compose_frame_updates_shared_image():
+    processor = ImageProcessor(16, alpha=0.0)
+    frame = np.zeros((32, 32, 3), dtype=np.uint8)
+    frame[...] = (0, 0, 255)  # BGR 红色
+    heatmap = np.zeros((16, 16), dtype=np.float32)
+    overlay = processor.composeFrame(frame, heatmap)
+    image = next(img for out, img in zip(processor._outputs, processor._outputImages) if out is overlay)
+    assert image.getpixel((3, 3))[:3] == (255, 0, 0)
@@ -0,0 +1,50 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from detection.posture import classifyPostures
+
+
+def referenceCounts(keypoints, boxes, confs, confThreshold=0.5):
+    # 原 detectFaces 中逐人判断的规则，用于核对向量化分类的结果
+    counts = {'Head Down': 0, 'Head Up': 0, 'Lying': 0, 'Raise Hand': 0}
+    for kpts, box, conf in zip(keypoints, boxes, confs):
+        x1, y1, x2, y2 = map(int, box)
+        h = y2 - y1
+        if conf < confThreshold:
+            continue
+        nose, leftShoulder, rightShoulder = kpts[0], kpts[5], kpts[6]
+        visibleFace = sum(1 for kp in kpts[:3] if kp[2] >= confThreshold)
+        if nose[1] > leftShoulder[1] and nose[1] > rightShoulder[1]:
+            counts['Head Down'] += 1
+        elif visibleFace == 3:
+            counts['Head Up'] += 1
+        else:
+            counts['Head Down'] += 1
+        if nose[1] > (leftShoulder[1] + rightShoulder[1]) / 2 + h * 0.2 and visibleFace <= 1:
+            counts['Lying'] += 1
+        if (kpts[9][2] >= confThreshold and kpts[9][1] > kpts[7][1]) or \
+                (kpts[10][2] >= confThreshold and kpts[10][1] > kpts[8][1]):
+            counts['Raise Hand'] += 1
+    return counts
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_counts_match_per_person_rules(seed):
+    rng = np.random.default_rng(seed)
+    n = 60
+    x1 = rng.uniform(0, 500, n)
+    y1 = rng.uniform(0, 300, n)
+    boxes = np.column_stack([x1, y1, x1 + rng.uniform(20, 80, n), y1 + rng.uniform(40, 160, n)]).astype(np.float32)
+    keypoints = np.empty((n, 17, 3), dtype=np.float32)
+    keypoints[:, :, 0] = x1[:, None] + rng.uniform(0, 80, (n, 17))
+    keypoints[:, :, 1] = y1[:, None] + rng.uniform(0, 160, (n, 17))
+    keypoints[:, :, 2] = rng.uniform(0, 1, (n, 17))
+    confs = rng.uniform(0.3, 1.0, n).astype(np.float32)
+
+    assert classifyPostures(keypoints, boxes, confs).counts == referenceCounts(keypoints, boxes, confs)
+
+
+def test_empty_frame():
+    batch = classifyPostures(np.zeros((0, 17, 3)), np.zeros((0, 4)), np.zeros(0))
+    assert batch.counts == {'Head Down': 0, 'Head Up': 0, 'Lying': 0, 'Raise Hand': 0}
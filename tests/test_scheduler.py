@@ -0,0 +1,28 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from detection.scheduler import AdaptiveScheduler
+
+
+def test_force_detect_survives_interval_recompute():
+    # 高运动帧（间隔最短）之后强制推理，下一帧即使静止、间隔被拉长也必须推理
+    scheduler = AdaptiveScheduler(minInterval=1, maxInterval=10, motionLow=0.01, motionHigh=0.1, motionSize=8)
+    dark = np.zeros((32, 32), dtype=np.uint8)
+    bright = np.full((32, 32), 255, dtype=np.uint8)
+    scheduler.shouldDetect(dark)
+    assert scheduler.shouldDetect(bright)
+    assert scheduler.interval == 1
+    scheduler.forceDetect()
+    assert scheduler.shouldDetect(bright)
+    assert scheduler.interval == 10
+    # 强制只生效一次
+    assert not scheduler.shouldDetect(bright)
+
+
+def test_still_scene_waits_for_interval():
+    scheduler = AdaptiveScheduler(minInterval=1, maxInterval=3, motionLow=0.01, motionHigh=0.1, motionSize=8)
+    grey = np.zeros((32, 32), dtype=np.uint8)
+    assert scheduler.shouldDetect(grey)
+    assert [scheduler.shouldDetect(grey) for _ in range(3)] == [False, False, True]
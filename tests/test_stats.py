@@ -0,0 +1,46 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from detection.posture import PostureBatch
+from detection.stats import SESSION, DetectionStats
+
+
+def batch(persons):
+    flags = np.arange(persons) % 2 == 0
+    return PostureBatch(np.ones(persons, dtype=bool), flags, ~flags, np.zeros(persons, dtype=bool),
+                        flags, np.array([persons, 1]), np.array([0.5 * persons, 0.5]))
+
+
+def test_window_sums_after_ring_buffer_wraps():
+    # 缓冲区只有4行，写入20帧后各窗口的和应与只看保留行的暴力计算一致
+    stats = DetectionStats(2, windows={'short': 2, 'long': 100}, historySize=4)
+    persons = [i % 5 for i in range(20)]
+    for t, count in enumerate(persons):
+        stats.update(float(t), np.full(count, 0.8), batch(count))
+
+    session = stats.snapshot(SESSION)
+    assert session.frames == 20
+    assert session.meanPersons == pytest.approx(np.mean(persons))
+
+    short = stats.snapshot('short')
+    assert short.frames == 3  # t = 17, 18, 19
+    assert short.meanPersons == pytest.approx(np.mean(persons[-3:]))
+    assert short.seconds == pytest.approx(2.0)
+
+    # 窗口比缓冲区长时只包含仍保留在缓冲区中的行
+    long = stats.snapshot('long')
+    assert long.frames == 4
+    assert long.meanPersons == pytest.approx(np.mean(persons[-4:]))
+    assert long.keypointCounts.tolist() == [sum(persons[-4:]), 4]
+    assert long.actionCounts.tolist() == [2, 2, 0, 2]  # 最后一帧 4 人
+
+
+def test_reset_clears_windows():
+    stats = DetectionStats(2, windows={'short': 2}, historySize=4)
+    for t in range(6):
+        stats.update(float(t), np.full(3, 0.8), batch(3))
+    stats.reset()
+    stats.update(10.0, np.full(1, 0.8), batch(1))
+    assert stats.snapshot(SESSION).frames == 1
+    assert stats.snapshot('short').meanPersons == pytest.approx(1.0)
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from detection.tiling import TileLayoutCache, TiledInference, nms
+
+
+class _Array:
+    # 模拟 torch 张量的 .cpu().numpy()
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data.copy()
+
+
+class _Boxes:
+    def __init__(self, boxes, confs):
+        self.xyxy = _Array(boxes)
+        self.conf = _Array(confs)
+
+    def __len__(self):
+        return len(self.conf.data)
+
+
+def fakeResult(boxes, confs):
+    # 切片内坐标的检测结果，关键点放在检测框左上角
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    keypoints = np.zeros((len(boxes), 17, 3), dtype=np.float32)
+    keypoints[:, :, 0] = boxes[:, :1]
+    keypoints[:, :, 1] = boxes[:, 1:2]
+    return SimpleNamespace(boxes=_Boxes(boxes, confs), keypoints=SimpleNamespace(data=_Array(keypoints)))
+
+
+class FakeModel:
+    def __init__(self, results):
+        self.results = results
+        self.crops = None
+
+    def __call__(self, crops, verbose=False):
+        self.crops = crops
+        return self.results
+
+
+def test_duplicates_across_overlapping_tiles_are_merged():
+    # 同一名学生落在两个重叠切片中，映射回原图后只保留置信度较高的一个
+    layouts = TileLayoutCache(path=None, rois={'cam': [(0, 0, 100, 100), (60, 0, 160, 100)]})
+    results = [
+        fakeResult([[70, 10, 90, 60]], [0.9]),
+        fakeResult([[10, 12, 30, 61], [80, 10, 95, 60]], [0.8, 0.7]),
+    ]
+    model = FakeModel(results)
+    boxes, confs, keypoints = TiledInference(model, 'cam', layouts, includeFullFrame=False)(
+        np.zeros((100, 160, 3), dtype=np.uint8))
+
+    assert len(model.crops) == 2
+    assert confs.tolist() == pytest.approx([0.9, 0.7])
+    assert boxes.tolist() == [[70, 10, 90, 60], [140, 10, 155, 60]]
+    # 关键点与检测框一起平移到原图坐标
+    assert keypoints[1, 0, :2].tolist() == [140, 10]
+
+
+def test_nms_keeps_separate_people():
+    boxes = np.array([[0, 0, 10, 20], [1, 0, 11, 20], [30, 0, 40, 20]], dtype=np.float32)
+    assert sorted(nms(boxes, np.array([0.6, 0.9, 0.5]), 0.5).tolist()) == [1, 2]
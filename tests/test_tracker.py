@@ -0,0 +1,54 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from detection.tracker import HEAD_DOWN, HEAD_UP, RAISE_HAND, PostureTracker
+
+BOX = np.array([[0, 0, 100, 200]], dtype=np.float32)
+
+
+def person(raiseHand):
+    # 面部可见、鼻子高于肩膀的抬头学生；原规则中手腕低于肘部计为举手
+    kpts = np.zeros((1, 17, 3), dtype=np.float32)
+    kpts[0, :, 2] = 0.9
+    kpts[0, :, 0] = 50
+    kpts[0, :3, 1] = 20
+    kpts[0, 5:7, 1] = 50
+    kpts[0, 7:9, 1] = 80
+    kpts[0, 9:11, 1] = 100 if raiseHand else 60
+    return kpts
+
+
+def step(tracker, raiseHand):
+    posture, trackIds = tracker.update(BOX, person(raiseHand), np.array([0.9]))
+    return bool(posture.raiseHand[0]), int(trackIds[0])
+
+
+def test_state_flips_after_hysteresis_frames():
+    tracker = PostureTracker(hysteresis=3)
+    assert step(tracker, False) == (False, 0)
+    # 前两帧举手仍沿用原状态，第三帧才切换并计一次事件
+    assert [step(tracker, True)[0] for _ in range(3)] == [False, False, True]
+    assert tracker.events[RAISE_HAND] == 1
+    assert tracker.events[HEAD_UP] == 1 and tracker.events[HEAD_DOWN] == 0
+
+
+def test_single_frame_flicker_is_ignored():
+    tracker = PostureTracker(hysteresis=3)
+    for _ in range(4):
+        step(tracker, True)
+    # 单帧抖动不切换，且下一帧恢复后待切换计数清零
+    assert step(tracker, False)[0] is True
+    assert step(tracker, True)[0] is True
+    assert [step(tracker, False)[0] for _ in range(3)] == [True, True, False]
+    assert tracker.events[RAISE_HAND] == 1
+
+
+def test_reset_counters_keeps_tracks():
+    tracker = PostureTracker(hysteresis=1)
+    step(tracker, True)
+    tracker.resetCounters()
+    assert tracker.events.sum() == 0
+    # 轨迹保留：同一个人不会被重新计为新事件
+    assert step(tracker, True) == (True, 0)
+    assert tracker.events.sum() == 0
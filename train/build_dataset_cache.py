@@ -0,0 +1,216 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+SHARD_BYTES = 1 << 30  # 单个分片文件的最大字节数
+
+# 每张图片在分片中的位置，标签统一存放在 labels.npy 中
+INDEX_DTYPE = np.dtype([
+    ('shard', '<i4'),
+    ('offset', '<i8'),
+    ('height', '<i4'),
+    ('width', '<i4'),
+    ('origHeight', '<i4'),
+    ('origWidth', '<i4'),
+    ('labelStart', '<i8'),
+    ('labelCount', '<i4'),
+])
+
+def label_path_for(image_path):
+    # 与 ultralytics 相同的约定：.../images/xxx.jpg -> .../labels/xxx.txt
+    sa, sb = f'{os.sep}images{os.sep}', f'{os.sep}labels{os.sep}'
+    return sb.join(image_path.rsplit(sa, 1)).rsplit('.', 1)[0] + '.txt'
+
+def validate_labels(rows, kpt_shape):
+    # 检查列数、坐标范围、可见性取值，以及可见关键点是否在检测框附近
+    num_kpts, ndim = kpt_shape
+    if rows.shape[1] != 5 + num_kpts * ndim:
+        return f'expected {5 + num_kpts * ndim} values per line, got {rows.shape[1]}'
+    if np.any(rows[:, 0] != 0):
+        return 'class id must be 0 (person)'
+    coords = rows[:, 1:]
+    if np.any(coords < 0) or np.any(rows[:, 1:5] > 1):
+        return 'coordinates outside [0, 1]'
+    if np.any(rows[:, 3:5] <= 0):
+        return 'empty bounding box'
+    kpts = rows[:, 5:].reshape(len(rows), num_kpts, ndim)
+    if ndim == 3:
+        if np.any(~np.isin(kpts[:, :, 2], (0, 1, 2))):
+            return 'keypoint visibility must be 0, 1 or 2'
+        visible = kpts[:, :, 2] > 0
+    else:
+        visible = np.ones(kpts.shape[:2], dtype=bool)
+    if np.any(kpts[:, :, :2][visible] > 1):
+        return 'keypoint outside image'
+    margin = 0.02
+    x1 = (rows[:, 1] - rows[:, 3] / 2 - margin)[:, None]
+    x2 = (rows[:, 1] + rows[:, 3] / 2 + margin)[:, None]
+    y1 = (rows[:, 2] - rows[:, 4] / 2 - margin)[:, None]
+    y2 = (rows[:, 2] + rows[:, 4] / 2 + margin)[:, None]
+    inside = (kpts[:, :, 0] >= x1) & (kpts[:, :, 0] <= x2) & (kpts[:, :, 1] >= y1) & (kpts[:, :, 1] <= y2)
+    if np.any(visible & ~inside):
+        return 'visible keypoint outside its bounding box'
+    return None
+
+def prepare_item(args):
+    # 在工作进程中解码、缩放图像并读取校验标签；返回 (状态, 图片路径, 图像, 原始尺寸, 标签, 说明)
+    image_path, imgsz, kpt_shape = args
+    try:
+        label_path = label_path_for(image_path)
+        rows = np.zeros((0, 5 + kpt_shape[0] * kpt_shape[1]), dtype=np.float32)
+        if os.path.exists(label_path) and os.path.getsize(label_path) > 0:
+            rows = np.loadtxt(label_path, dtype=np.float32, ndmin=2)
+            error = validate_labels(rows, kpt_shape)
+            if error:
+                return 'invalid', image_path, None, None, None, error
+        img = cv2.imread(image_path)
+        if img is None:
+            return 'error', image_path, None, None, None, 'cannot decode image'
+        h0, w0 = img.shape[:2]
+        # 与 ultralytics 的 load_image 一致：长边缩放到 imgsz，保持宽高比
+        r = imgsz / max(h0, w0)
+        if r != 1:
+            w, h = min(imgsz, round(w0 * r)), min(imgsz, round(h0 * r))
+            img = cv2.resize(img, (w, h), interpolation=cv2.INTER_LINEAR if r > 1 else cv2.INTER_AREA)
+        return 'ok', image_path, np.ascontiguousarray(img), (h0, w0), rows, ''
+    except Exception as e:
+        return 'error', image_path, None, None, None, str(e)
+
+class ShardWriter:
+    def __init__(self, out_dir, split, shard_bytes=SHARD_BYTES):
+        self.out_dir = out_dir
+        self.split = split
+        self.shard_bytes = shard_bytes
+        self.shard = -1
+        self.offset = 0
+        self.file = None
+
+    def write(self, img):
+        data = img.tobytes()
+        if self.file is None or self.offset + len(data) > self.shard_bytes:
+            self._next()
+        offset = self.offset
+        self.file.write(data)
+        self.offset += len(data)
+        return self.shard, offset
+
+    def _next(self):
+        self.close()
+        self.shard += 1
+        self.offset = 0
+        self.file = open(os.path.join(self.out_dir, f'{self.split}_{self.shard:03d}.bin'), 'wb')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def build_split(image_dir, out_dir, split, imgsz, kpt_shape, workers=None, chunksize=16):
+    image_files = sorted(f for f in glob(os.path.join(image_dir, '*')) if f.lower().endswith(IMAGE_EXTENSIONS))
+    writer = ShardWriter(out_dir, split)
+    index = np.zeros(len(image_files), dtype=INDEX_DTYPE)
+    labels, names = [], []
+    counts = {'ok': 0, 'invalid': 0, 'error': 0}
+    label_count = 0
+    began = time.time()
+    tasks = [(f, imgsz, kpt_shape) for f in image_files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for status, image_path, img, orig, rows, message in pool.map(prepare_item, tasks, chunksize=chunksize):
+            counts[status] += 1
+            if status != 'ok':
+                print(f"Skipping {image_path}: {message}")
+                continue
+            shard, offset = writer.write(img)
+            i = len(names)
+            index[i] = (shard, offset, img.shape[0], img.shape[1], orig[0], orig[1], label_count, len(rows))
+            labels.append(rows)
+            label_count += len(rows)
+            names.append(os.path.basename(image_path))
+    writer.close()
+
+    index = index[:len(names)]
+    width = 5 + kpt_shape[0] * kpt_shape[1]
+    np.save(os.path.join(out_dir, f'{split}_index.npy'), index)
+    np.save(os.path.join(out_dir, f'{split}_labels.npy'),
+            np.concatenate(labels).astype(np.float32) if labels else np.zeros((0, width), dtype=np.float32))
+    with open(os.path.join(out_dir, f'{split}_files.json'), 'w', encoding='utf-8') as f:
+        json.dump(names, f, ensure_ascii=False)
+    elapsed = time.time() - began
+    print(f"{split}: {counts['ok']} images ({label_count} persons) in {writer.shard + 1} shards, "
+          f"{counts['invalid']} invalid labels, {counts['error']} errors, "
+          f"{len(image_files) / max(elapsed, 1e-6):.0f} images/s")
+    return dict(counts, persons=label_count, shards=writer.shard + 1)
+
+class ShardDataset:
+    # 只读访问构建好的分片：图像直接从内存映射中切片，不解码、不拷贝
+    def __init__(self, cache_dir, split):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.index = np.load(os.path.join(cache_dir, f'{split}_index.npy'))
+        self.labels = np.load(os.path.join(cache_dir, f'{split}_labels.npy'), mmap_mode='r')
+        with open(os.path.join(cache_dir, f'{split}_files.json'), encoding='utf-8') as f:
+            self.names = json.load(f)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.shard_paths = sorted(glob(os.path.join(cache_dir, f'{split}_[0-9][0-9][0-9].bin')))
+        self.shards = None
+
+    def __getstate__(self):
+        # 传给DataLoader工作进程时不序列化内存映射（否则会拷贝整个分片），由各进程自行重新映射
+        state = self.__dict__.copy()
+        state['shards'] = None
+        return state
+
+    def __len__(self):
+        return len(self.index)
+
+    def lookup(self, image_path):
+        return self.positions.get(os.path.basename(image_path))
+
+    def image(self, i):
+        if self.shards is None:
+            self.shards = [np.memmap(path, dtype=np.uint8, mode='r') for path in self.shard_paths]
+        entry = self.index[i]
+        size = int(entry['height']) * int(entry['width']) * 3
+        data = self.shards[entry['shard']][entry['offset']:entry['offset'] + size]
+        return data.reshape(int(entry['height']), int(entry['width']), 3), (int(entry['origHeight']), int(entry['origWidth']))
+
+    def label(self, i):
+        entry = self.index[i]
+        return self.labels[entry['labelStart']:entry['labelStart'] + entry['labelCount']]
+
+    def __getitem__(self, i):
+        img, orig = self.image(i)
+        return img, orig, self.label(i), self.names[i]
+
+def build_cache(dataset_dir, out_dir, splits, imgsz, kpt_shape, workers=None):
+    os.makedirs(out_dir, exist_ok=True)
+    meta = {'imgsz': imgsz, 'kpt_shape': list(kpt_shape), 'splits': {}}
+    for split in splits:
+        image_dir = os.path.join(dataset_dir, 'images', split)
+        if not os.path.isdir(image_dir):
+            print(f"Image folder not found: {image_dir}")
+            continue
+        meta['splits'][split] = build_split(image_dir, out_dir, split, imgsz, kpt_shape, workers)
+    with open(os.path.join(out_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Pre-resize images and pack them with pose labels into memory-mapped shards')
+    parser.add_argument('--dataset_dir', required=True, help='Dataset root containing images/<split> and labels/<split>')
+    parser.add_argument('--out_dir', default=None, help='Cache folder (default: <dataset_dir>/cache)')
+    parser.add_argument('--splits', nargs='+', default=['train', 'val'])
+    parser.add_argument('--imgsz', type=int, default=640, help='Training image size (must match train.sh)')
+    parser.add_argument('--kpt_shape', type=int, nargs=2, default=[11, 3], help='Must match classroom_dataset.yaml')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    args = parser.parse_args()
+    build_cache(args.dataset_dir, args.out_dir or os.path.join(args.dataset_dir, 'cache'),
+                args.splits, args.imgsz, args.kpt_shape, args.workers)
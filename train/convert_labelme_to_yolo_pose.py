@@ -1,7 +1,9 @@
 import json
+import math
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from glob import glob
-from PIL import Image
 
 keypoints_order = ['Nose', 'Left Eye', 'Right Eye', 'Left Ear', 'Right Ear',
                    'Left Shoulder', 'Right Shoulder', 'Left Elbow', 'Right Elbow',
@@ -9,54 +11,147 @@ keypoints_order = ['Nose', 'Left Eye', 'Right Eye', 'Left Ear', 'Right Ear',
 
 label_map = {name: idx for idx, name in enumerate(keypoints_order)}
 
-def convert_labelme_to_yolo(json_file, img_dir, out_dir):
-    with open(json_file) as f:
-        data = json.load(f)
+MANIFEST_NAME = 'manifest.json'
 
+# 未分组的关键点按标注顺序拆分成人时，与当前这个人最近的点相距超过该比例（相对图像长边）就视为下一个人
+MAX_PERSON_GAP = 0.125
+
+def image_size(data, json_file, img_dir):
+    # 优先使用LabelMe记录的图像尺寸；没有时只读取图像文件头，不解码像素
+    if data.get('imageWidth') and data.get('imageHeight'):
+        return data['imageWidth'], data['imageHeight']
     img_path = os.path.join(img_dir, os.path.basename(json_file).replace('.json', '.jpg'))
+    if not os.path.exists(img_path) and data.get('imagePath'):
+        img_path = os.path.join(img_dir, os.path.basename(data['imagePath']))
     if not os.path.exists(img_path):
-        print(f"Image not found: {img_path}")
-        return
-    img = Image.open(img_path)
-    W, H = img.size
+        raise FileNotFoundError(f"Image not found: {img_path}")
+    from PIL import Image
+    with Image.open(img_path) as img:
+        return img.size
 
-    kpts = [(0.0, 0.0, 0) for _ in range(len(keypoints_order))]
-    xs, ys = [], []
+def person_line(points, W, H):
+    # points: {关键点序号: (x, y)}，检测框取可见关键点的外接矩形
+    kpts = [(0.0, 0.0, 0)] * len(keypoints_order)
+    for idx, (x, y) in points.items():
+        kpts[idx] = (x / W, y / H, 2)
+    xs = [kpts[idx][0] for idx in points]
+    ys = [kpts[idx][1] for idx in points]
+    x_min, x_max = min(xs), max(xs)
+    y_min, y_max = min(ys), max(ys)
+    values = [(x_min + x_max) / 2, (y_min + y_max) / 2, x_max - x_min, y_max - y_min]
+    parts = ['0'] + [f'{v:.6f}' for v in values]
+    for x, y, v in kpts:
+        parts.append(f'{x:.6f} {y:.6f} {v}')
+    return ' '.join(parts)
 
-    for shape in data['shapes']:
-        label = shape['label']
-        if label not in label_map:
+def split_ungrouped(shapes, max_gap):
+    # 没有 group_id 时按标注顺序拆分：标签重复或与当前这个人距离过远时开始下一个人；
+    # 之后把不含鼻子的零散片段并入附近、标签不重复的人，避免标注顺序在相邻学生之间来回切换时拆出多余的人
+    persons, current = [], None
+    for idx, (x, y) in shapes:
+        if (current is None or idx in current
+                or min(math.dist((x, y), point) for point in current.values()) > max_gap):
+            current = {}
+            persons.append(current)
+        current[idx] = (x, y)
+    nose = label_map['Nose']
+    anchored = [points for points in persons if nose in points]
+    result = list(anchored)
+    for fragment in persons:
+        if nose in fragment:
             continue
+        candidates = [(min(math.dist(a, b) for a in fragment.values() for b in points.values()), i)
+                      for i, points in enumerate(anchored) if not set(fragment) & set(points)]
+        best = min(candidates, default=None)
+        if best is not None and best[0] <= max_gap:
+            anchored[best[1]].update(fragment)
+        else:
+            result.append(fragment)
+    return result
+
+def group_persons(shapes, max_gap):
+    # 同一张图中的多个学生用 group_id 区分；同一组内标签重复说明标注有误，直接报错而不是悄悄覆盖
+    grouped, ungrouped = {}, []
+    for shape in shapes:
+        label = shape.get('label')
+        if label not in label_map or not shape.get('points'):
+            continue
+        idx = label_map[label]
         x, y = shape['points'][0]
-        xi = x / W
-        yi = y / H
-        kpts[label_map[label]] = (xi, yi, 2)
-        xs.append(xi)
-        ys.append(yi)
+        group_id = shape.get('group_id')
+        if group_id is None:
+            ungrouped.append((idx, (x, y)))
+            continue
+        points = grouped.setdefault(group_id, {})
+        if idx in points:
+            raise ValueError(f"Duplicate keypoint '{label}' in group {group_id}")
+        points[idx] = (x, y)
+    persons = [points for _, points in sorted(grouped.items(), key=lambda item: str(item[0]))]
+    return persons + split_ungrouped(ungrouped, max_gap)
 
-    if not xs or not ys:
-        return
+def convert_labelme_to_yolo(json_file, img_dir, out_dir, force=False, max_gap=MAX_PERSON_GAP):
+    # 返回 (状态, JSON文件, 人数, 说明)，状态为 converted / skipped / empty / error
+    out_path = os.path.join(out_dir, os.path.basename(json_file).replace('.json', '.txt'))
+    try:
+        if not force and os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(json_file):
+            return 'skipped', json_file, None, ''
+        with open(json_file, encoding='utf-8') as f:
+            data = json.load(f)
+        W, H = image_size(data, json_file, img_dir)
 
-    x_min, x_max = min(xs), max(xs)
-    y_min, y_max = min(ys), max(ys)
-    x_center = (x_min + x_max) / 2
-    y_center = (y_min + y_max) / 2
-    width = x_max - x_min
-    height = y_max - y_min
+        persons = group_persons(data.get('shapes', []), max_gap * max(W, H))
+        if not persons:
+            return 'empty', json_file, 0, ''
+        lines = [person_line(points, W, H) for points in persons]
+        with open(out_path, 'w') as f:
+            f.write('\n'.join(lines))
+        return 'converted', json_file, len(lines), ''
+    except Exception as e:
+        return 'error', json_file, None, str(e)
 
-    line = f"0 {x_center} {y_center} {width} {height} "
-    for x, y, v in kpts:
-        line += f"{x} {y} {v} "
+def _convert_args(args):
+    return convert_labelme_to_yolo(*args)
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except (OSError, ValueError) as e:
+        print(f"Error loading manifest: {e}")
+        return {}
 
+def convert_folder(json_dir, img_dir, out_dir, workers=None, force=False, chunksize=64, max_gap=MAX_PERSON_GAP):
+    json_files = sorted(glob(os.path.join(json_dir, '*.json')))
     os.makedirs(out_dir, exist_ok=True)
-    out_path = os.path.join(out_dir, os.path.basename(json_file).replace('.json', '.txt'))
-    with open(out_path, 'w') as f:
-        f.write(line.strip())
+    manifest = load_manifest(out_dir)
+    counts = {'converted': 0, 'skipped': 0, 'empty': 0, 'error': 0}
+    began = time.time()
+    tasks = [(jf, img_dir, out_dir, force, max_gap) for jf in json_files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for done, (status, json_file, persons, message) in enumerate(
+                pool.map(_convert_args, tasks, chunksize=chunksize), 1):
+            counts[status] += 1
+            name = os.path.basename(json_file)
+            if status == 'skipped' and name in manifest:
+                continue
+            manifest[name] = {'status': status, 'persons': persons, 'message': message}
+            if status == 'error':
+                print(f"Error converting {json_file}: {message}")
+            if done % 1000 == 0:
+                print(f"{done}/{len(tasks)}  {done / max(time.time() - began, 1e-6):.0f} files/s")
 
-def convert_folder(json_dir, img_dir, out_dir):
-    json_files = glob(os.path.join(json_dir, '*.json'))
-    for jf in json_files:
-        convert_labelme_to_yolo(jf, img_dir, out_dir)
+    elapsed = time.time() - began
+    summary = dict(counts, total=len(json_files), seconds=round(elapsed, 2),
+                   filesPerSecond=round(len(json_files) / max(elapsed, 1e-6), 1))
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump({'summary': summary, 'files': manifest}, f, ensure_ascii=False, indent=1)
+    print(f"Converted {counts['converted']}, skipped {counts['skipped']} (up to date), "
+          f"empty {counts['empty']}, errors {counts['error']} in {elapsed:.1f}s "
+          f"({summary['filesPerSecond']} files/s)")
+    return summary
 
 if __name__ == '__main__':
     import argparse
@@ -64,5 +159,9 @@ if __name__ == '__main__':
     parser.add_argument('--json_dir', required=True, help='Path to LabelMe JSON folder')
     parser.add_argument('--img_dir', required=True, help='Path to image folder')
     parser.add_argument('--out_dir', required=True, help='Path to save YOLO txt labels')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Reconvert files even if the label is up to date')
+    parser.add_argument('--max_gap', type=float, default=MAX_PERSON_GAP,
+                        help='Split ungrouped keypoints into a new person beyond this distance (fraction of the image long side)')
     args = parser.parse_args()
-    convert_folder(args.json_dir, args.img_dir, args.out_dir)
+    convert_folder(args.json_dir, args.img_dir, args.out_dir, args.workers, args.force, max_gap=args.max_gap)
@@ -0,0 +1,72 @@
+import os
+
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.pose import PoseTrainer
+from ultralytics.utils.torch_utils import de_parallel
+
+from build_dataset_cache import ShardDataset
+
+CACHE_DIR = 'datasets/classroom_dataset/cache'
+
+class ShardYOLODataset(YOLODataset):
+    # 图像从 build_dataset_cache.py 生成的分片中读取（已缩放到 imgsz），分片中没有的图像仍按原方式解码
+    def __init__(self, *args, shards=None, **kwargs):
+        self.shards = shards
+        super().__init__(*args, **kwargs)
+
+    def load_image(self, i, rect_mode=True):
+        position = self.shards.lookup(self.im_files[i]) if self.shards is not None else None
+        if position is None or self.shards.meta['imgsz'] != self.imgsz:
+            return super().load_image(i, rect_mode)
+        img, orig = self.shards.image(position)
+        # 数据增强会原地修改图像，这里拷贝一份；拷贝来自页缓存，不需要解码JPEG
+        img = img.copy()
+        return img, orig, img.shape[:2]
+
+class CachedPoseTrainer(PoseTrainer):
+    def __init__(self, *args, cache_dir=CACHE_DIR, **kwargs):
+        self.cache_dir = cache_dir
+        super().__init__(*args, **kwargs)
+
+    def build_dataset(self, img_path, mode='train', batch=None):
+        split = os.path.basename(os.path.normpath(img_path))
+        shards = None
+        if os.path.exists(os.path.join(self.cache_dir, f'{split}_index.npy')):
+            shards = ShardDataset(self.cache_dir, split)
+        else:
+            print(f"No shard cache for {split} in {self.cache_dir}, decoding images")
+        stride = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        return ShardYOLODataset(
+            img_path=img_path,
+            imgsz=self.args.imgsz,
+            batch_size=batch,
+            augment=mode == 'train',
+            hyp=self.args,
+            rect=mode == 'val',
+            cache=None,
+            single_cls=self.args.single_cls or False,
+            stride=stride,
+            pad=0.0 if mode == 'train' else 0.5,
+            prefix=f'{mode}: ',
+            task=self.args.task,
+            classes=self.args.classes,
+            data=self.data,
+            fraction=self.args.fraction if mode == 'train' else 1.0,
+            shards=shards,
+        )
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Train the pose model reading images from the shard cache')
+    parser.add_argument('--model', default='yolov11n-pose.pt')
+    parser.add_argument('--data', default='datasets/classroom_dataset.yaml')
+    parser.add_argument('--cache_dir', default=CACHE_DIR, help='Output of build_dataset_cache.py')
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--name', default='classroom_dataset_pose_train')
+    args = parser.parse_args()
+    trainer = CachedPoseTrainer(overrides=dict(model=args.model, data=args.data, epochs=args.epochs,
+                                               imgsz=args.imgsz, batch=args.batch, name=args.name),
+                                cache_dir=args.cache_dir)
+    trainer.train()
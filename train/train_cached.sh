@@ -0,0 +1,13 @@
+python build_dataset_cache.py \
+    --dataset_dir datasets/classroom_dataset \
+    --imgsz 640 \
+    --kpt_shape 11 3
+
+python train_cached.py \
+    --model yolov11n-pose.pt \
+    --data datasets/classroom_dataset.yaml \
+    --cache_dir datasets/classroom_dataset/cache \
+    --epochs 50 \
+    --imgsz 640 \
+    --batch 16 \
+    --name classroom_dataset_pose_train
@@ -1,17 +1,44 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import StringVar
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.font_manager as fm
-from PIL import Image, ImageTk
+import os
+from PIL import Image, ImageTk, ImageFont
+from config import CHART_TOLERANCE, FONT_PATH, BORDER_IMAGE_PATH, ASSET_CACHE_DIR
 try:
     resample_lanczos = Image.Resampling.LANCZOS
 except AttributeError:
     resample_lanczos = Image.NEAREST
 
-fontPath = 'ui/AlimamaShuHeiTi-Bold.ttf'
-customFont = fm.FontProperties(fname=fontPath)
+fontPath = FONT_PATH
+
+class FontInfo:
+    # 启动时只读取字体名称，matplotlib字体管理器等到创建图表时才加载
+    def __init__(self, fname):
+        self.fname = fname
+        try:
+            self.name = ImageFont.truetype(fname, 12).getname()[0]
+        except Exception as e:
+            print(f"Error loading font: {e}")
+            self.name = 'TkDefaultFont'
+
+    def get_name(self):
+        return self.name
+
+customFont = FontInfo(fontPath)
+
+def loadResizedAsset(path, size):
+    # 缩放后的界面素材按窗口尺寸缓存到磁盘，之后启动直接读取
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cachePath = os.path.join(ASSET_CACHE_DIR, f'{stem}_{size[0]}x{size[1]}.png')
+    if os.path.exists(cachePath) and os.path.getmtime(cachePath) >= os.path.getmtime(path):
+        return Image.open(cachePath)
+    image = Image.open(path).resize(size, resample_lanczos)
+    try:
+        os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+        image.save(cachePath)
+    except OSError as e:
+        print(f"Error caching {path}: {e}")
+    return image
 
 class MainWindow:
     def __init__(self):
@@ -25,19 +52,18 @@ class MainWindow:
         self.imgSize = int(self.windowWidth * 0.6)
         self.window.geometry(f'{self.windowWidth}x{self.windowHeight}')
         try:
-            self.borderImagePil = Image.open("static/border.png")
-            self.borderImagePil = self.borderImagePil.resize((self.windowWidth, self.windowHeight), resample_lanczos)
+            self.borderImagePil = loadResizedAsset(BORDER_IMAGE_PATH, (self.windowWidth, self.windowHeight))
             self.borderImage = ImageTk.PhotoImage(self.borderImagePil)
             self.backgroundLabel = tk.Label(self.window, image=self.borderImage)
             self.backgroundLabel.place(x=0, y=0, relwidth=1, relheight=1)
         except Exception as e:
             print(f"Error loading border image: {e}")
             self.window.configure(bg='#f5f5f7')
-        plt.rcParams['font.sans-serif'] = ['Microsoft YaHei']
-        plt.rcParams['axes.unicode_minus'] = False
         self._initStyles()
         self._createMainFrame()
         self._createFrames()
+        # 窗口先显示出来，图表（需要导入matplotlib）在首次绘制之后再创建
+        self.window.after(50, self.trendFrame.build)
 
     def _initStyles(self):
         self.style = ttk.Style()
@@ -155,6 +181,7 @@ class DisplayFrame:
         
         # 初始化图片显示
         self.image_label = ttk.Label(self.frame)
+        self.image_label.image = None
         self.image_label.grid(column=0, row=1, pady=5, padx=5, sticky="nsew")
 
 class StatsFrame:
@@ -230,6 +257,32 @@ class StatsFrame:
         self.warning_label = tk.Label(self.warning_frame, text="", bg='#f5f5f7', fg='#ff3b30', 
                                     font=(customFont.get_name(), int(base_font * 0.7), 'bold'))
         self.warning_label.pack(anchor=tk.W)
+        
+        # 启动时加载模型和摄像头的进度条
+        self.progress = ttk.Progressbar(self.frame, mode='determinate', maximum=100)
+        self.progress.grid(column=0, row=3, sticky="ew", pady=5)
+        self.progress.grid_remove()
+        
+        # 性能分析面板，启用性能分析时才显示
+        self.perf_var = StringVar()
+        self.perf_label = ttk.Label(self.frame, textvariable=self.perf_var, 
+                                    font=('Courier', int(base_font * 0.5)))
+        self.perf_label.grid(column=0, row=4, sticky=tk.W, pady=5)
+        self.perf_label.grid_remove()
+    
+    def show_progress(self, text, value):
+        """显示启动加载进度"""
+        self.var.set(text)
+        self.progress['value'] = value
+        self.progress.grid()
+
+    def hide_progress(self):
+        self.progress.grid_remove()
+
+    def update_perf(self, text):
+        """更新性能分析面板"""
+        self.perf_var.set(text)
+        self.perf_label.grid()
     
     def update_stats(self, basic_info, person_stat=None, head_up_stat=None, 
                      head_down_stat=None, lying_stat=None, hand_stat=None, warning=None, is_low_head_or_lying=False):
@@ -273,21 +326,41 @@ class PoseRatioFrame:
         self.frame = ttk.LabelFrame(parent, text=" 姿态比例分析", padding="10")
         self.frame.grid_columnconfigure(0, weight=1)
         self.frame.grid_rowconfigure(0, weight=1)
+        self.window_width = window_width
+        self.window_height = window_height
+        self.base_font = base_font
+        self.canvas = None
+        self.background = None
+        self.lastValues = None
         
-        # 创建三个子图的布局
-        self.fig, self.axes = plt.subplots(3, 1, figsize=(window_width/150, window_height/250), sharex=True)
-        self.fig.subplots_adjust(hspace=0.4)  # 调整子图间距
+    def build(self):
+        # 延迟导入matplotlib并创建图表
+        import matplotlib
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        import matplotlib.font_manager as fm
+        try:
+            fm.fontManager.addfont(fontPath)
+        except Exception as e:
+            print(f"Error registering font: {e}")
         
         # 设置图表字体大小和样式
-        plt.rcParams.update({
-            'font.size': int(base_font * 0.7),
+        matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei']
+        matplotlib.rcParams['axes.unicode_minus'] = False
+        matplotlib.rcParams.update({
+            'font.size': int(self.base_font * 0.7),
             'font.family': customFont.get_name(),
-            'axes.titlesize': int(base_font * 0.8),
-            'axes.labelsize': int(base_font * 0.7),
-            'xtick.labelsize': int(base_font * 0.6),
-            'ytick.labelsize': int(base_font * 0.6)
+            'axes.titlesize': int(self.base_font * 0.8),
+            'axes.labelsize': int(self.base_font * 0.7),
+            'xtick.labelsize': int(self.base_font * 0.6),
+            'ytick.labelsize': int(self.base_font * 0.6)
         })
         
+        # 创建三个子图的布局
+        self.fig = Figure(figsize=(self.window_width/150, self.window_height/250))
+        self.axes = self.fig.subplots(3, 1, sharex=True)
+        self.fig.subplots_adjust(hspace=0.4)  # 调整子图间距
+        
         # 设置三个子图的标题和标签
         self.axes[0].set_title('抬头率', fontweight='bold', color='#007aff')
         self.axes[1].set_title('举手率', fontweight='bold', color='#34c759')
@@ -310,26 +383,50 @@ class PoseRatioFrame:
         # 设置X轴标签只在最后一个子图显示
         self.axes[2].set_xlabel('百分比 (%)')
         
+        # 条形和标题是每帧变化的动态元素，不参与背景绘制，只通过blit重绘
+        self.bars = [self.head_up_bar[0], self.hand_up_bar[0], self.head_down_bar[0]]
+        self.titlePrefixes = ['抬头率', '举手率', '低头+趴卧率']
+        self.animatedArtists = self.bars + [ax.title for ax in self.axes]
+        for artist in self.animatedArtists:
+            artist.set_animated(True)
+        
         # 创建画布
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # 每次完整重绘（包括窗口缩放）后重新缓存静态背景
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.draw_idle()
         
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self.animatedArtists:
+            self.fig.draw_artist(artist)
+
     def update_bars(self, head_up_rate, hand_up_rate, head_down_rate):
         """更新三个水平条形图的数据"""
-        # 更新抬头率条形图
-        self.head_up_bar[0].set_width(head_up_rate)
-        self.axes[0].set_title(f'抬头率: {head_up_rate:.1f}%', fontweight='bold', color='#007aff')
-        
-        # 更新举手率条形图
-        self.hand_up_bar[0].set_width(hand_up_rate)
-        self.axes[1].set_title(f'举手率: {hand_up_rate:.1f}%', fontweight='bold', color='#34c759')
+        if self.canvas is None:
+            return
+        values = (head_up_rate, hand_up_rate, head_down_rate)
+        # 数值变化不超过容差时不重绘
+        if self.lastValues is not None and all(abs(v - last) < CHART_TOLERANCE for v, last in zip(values, self.lastValues)):
+            return
+        self.lastValues = values
         
-        # 更新低头+趴卧率条形图
-        self.head_down_bar[0].set_width(head_down_rate)
-        self.axes[2].set_title(f'低头+趴卧率: {head_down_rate:.1f}%', fontweight='bold', color='#ff3b30')
+        for ax, bar, prefix, value in zip(self.axes, self.bars, self.titlePrefixes, values):
+            bar.set_width(value)
+            ax.title.set_text(f'{prefix}: {value:.1f}%')
         
-        # 重绘画布
-        self.canvas.draw()
+        if self.background is None:
+            # 首次绘制，draw_event 中会缓存背景
+            self.canvas.draw()
+            return
+        # 恢复缓存的背景，只重绘条形和标题
+        self.canvas.restore_region(self.background)
+        self._draw_animated()
+        self.canvas.blit(self.fig.bbox)
 
 class ExportFrame:
     def __init__(self, parent, base_font):
@@ -0,0 +1,245 @@
+import glob
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+import numpy as np
+from config import (EXPORT_DIR, ANALYTICS_CACHE_DIR, ANALYTICS_THRESHOLD, ANALYTICS_BUCKET_SECONDS,
+                    ANALYTICS_MAX_GAP)
+from utils.exporter import EXPORT_COLUMNS
+from utils.session_store import SESSION_DTYPE
+
+# 导出文件名：抬头率数据_[名称_]年月日_时分秒
+EXPORT_NAME_PATTERN = re.compile(r'^抬头率数据_(?:(?P<room>.+)_)?(?P<stamp>\d{8}_\d{6})$')
+
+SESSION_SUMMARY_DTYPE = np.dtype([
+    ('session', '<i4'),
+    ('rows', '<i4'),
+    ('duration', '<f8'),
+    ('meanRate', '<f8'),
+    ('p10Rate', '<f8'),
+    ('p50Rate', '<f8'),
+    ('p90Rate', '<f8'),
+    ('belowSeconds', '<f8'),
+    ('belowRatio', '<f8'),
+    ('handEvents', '<i4'),
+    ('handPerMinute', '<f8'),
+    ('meanPersons', '<f8'),
+])
+
+BUCKET_SUMMARY_DTYPE = np.dtype([
+    ('session', '<i4'),
+    ('bucket', '<i4'),
+    ('start', '<f8'),
+    ('rows', '<i4'),
+    ('meanRate', '<f8'),
+    ('minRate', '<f8'),
+    ('belowSeconds', '<f8'),
+    ('handEvents', '<i4'),
+    ('handPerMinute', '<f8'),
+])
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return f'{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}'
+
+
+def _readExport(path):
+    # 导出文件只在第一次读取时解析，之后使用列式缓存
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.parquet', '.feather'):
+        import pandas as pd
+        table = pd.read_parquet(path) if ext == '.parquet' else pd.read_feather(path)
+        matrix = table.to_numpy(dtype=np.float64)
+    else:
+        try:
+            import pandas as pd
+            matrix = pd.read_csv(path, encoding='utf-8').to_numpy(dtype=np.float64)
+        except ImportError:
+            matrix = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2, encoding='utf-8')
+    data = np.zeros(len(matrix), dtype=SESSION_DTYPE)
+    for i, name in enumerate(EXPORT_COLUMNS):
+        if i < matrix.shape[1]:
+            data[name] = matrix[:, i]
+    return data
+
+
+def parseSessionName(path):
+    # 从文件名中解析教室名称和开始时间，无法解析时返回 (None, None)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = EXPORT_NAME_PATTERN.match(stem)
+    if match is None:
+        return None, None
+    try:
+        start = datetime.strptime(match.group('stamp'), '%Y%m%d_%H%M%S')
+    except ValueError:
+        start = None
+    return match.group('room'), start
+
+
+def groupPercentile(values, groups, groupCount, q):
+    # 按组计算分位数：先按 (组, 值) 排序，再取每组内对应位置，全程无Python循环
+    order = np.lexsort((values, groups))
+    counts = np.bincount(groups, minlength=groupCount)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    positions = starts + np.floor(q * np.maximum(counts - 1, 0)).astype(np.int64)
+    result = np.full(groupCount, np.nan)
+    valid = counts > 0
+    result[valid] = values[order][positions[valid]]
+    return result
+
+
+class SessionArchive:
+    # 多个会话导出（CSV/Parquet/Feather）或会话记录（.bin）的只读集合，数据按列内存映射，聚合结果缓存到磁盘
+    def __init__(self, paths=None, cacheDir=ANALYTICS_CACHE_DIR):
+        self.cacheDir = cacheDir
+        os.makedirs(cacheDir, exist_ok=True)
+        self.paths = self._expand(paths if paths else [EXPORT_DIR])
+        self.sessions = []
+        for path in self.paths:
+            room, start = parseSessionName(path)
+            self.sessions.append({'path': path, 'room': room, 'start': start})
+
+    def _expand(self, paths):
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for pattern in ('*.csv', '*.parquet', '*.feather', '*.bin'):
+                    files.extend(glob.glob(os.path.join(path, pattern)))
+            elif os.path.exists(path):
+                files.append(path)
+        return sorted(set(files))
+
+    def _cachePath(self, path, suffix):
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cacheDir, f'{key}{suffix}')
+
+    def load(self, path):
+        # 返回单个会话的只读内存映射
+        if path.endswith('.bin'):
+            count = os.path.getsize(path) // SESSION_DTYPE.itemsize
+            if count == 0:
+                return np.zeros(0, dtype=SESSION_DTYPE)
+            return np.memmap(path, dtype=SESSION_DTYPE, mode='r', shape=(count,))
+        cachePath = self._cachePath(path, '.npy')
+        if not os.path.exists(cachePath) or os.path.getmtime(cachePath) < os.path.getmtime(path):
+            try:
+                np.save(cachePath, _readExport(path))
+            except (OSError, ValueError) as e:
+                print(f"Error loading {path}: {e}")
+                return np.zeros(0, dtype=SESSION_DTYPE)
+        return np.load(cachePath, mmap_mode='r')
+
+    def data(self, indices=None):
+        # 指定会话（默认全部）拼接为一个数组，并返回每行所属会话在 indices 中的序号
+        indices = range(len(self.sessions)) if indices is None else indices
+        parts = [self.load(self.sessions[i]['path']) for i in indices]
+        lengths = np.array([len(part) for part in parts], dtype=np.int64)
+        data = np.concatenate(parts) if parts else np.zeros(0, dtype=SESSION_DTYPE)
+        groups = np.repeat(np.arange(len(parts), dtype=np.int64), lengths)
+        return data, groups
+
+    def _summarize(self, kind, params, dtype, compute):
+        # 聚合结果按会话文件分别缓存；只有新增或修改过的会话需要计算，且这些会话一次性向量化计算
+        cachePaths = []
+        for session in self.sessions:
+            key = hashlib.sha1(json.dumps([kind, params, _signature(session['path'])]).encode('utf-8'))
+            cachePaths.append(os.path.join(self.cacheDir, f'{kind}_{key.hexdigest()[:16]}.npy'))
+        results = [None] * len(self.sessions)
+        missing = []
+        for i, cachePath in enumerate(cachePaths):
+            if os.path.exists(cachePath):
+                try:
+                    results[i] = np.load(cachePath)
+                    continue
+                except (OSError, ValueError) as e:
+                    print(f"Error loading aggregate cache: {e}")
+            missing.append(i)
+        if missing:
+            computed = compute(*self._rowMetrics(missing, *params[-2:]), len(missing))
+            for j, i in enumerate(missing):
+                part = computed[computed['session'] == j]
+                try:
+                    np.save(cachePaths[i], part)
+                except OSError as e:
+                    print(f"Error saving aggregate cache: {e}")
+                results[i] = part
+        for i, part in enumerate(results):
+            part['session'] = i
+        return np.concatenate(results) if results else np.zeros(0, dtype=dtype)
+
+    def _rowMetrics(self, indices, threshold, maxGap):
+        # 每行代表的时长（到下一行的间隔，超过 maxGap 视为中断）以及举手事件数（举手人数的增量）
+        data, groups = self.data(indices)
+        times = np.asarray(data['time'], dtype=np.float64)
+        rates = np.asarray(data['rate'], dtype=np.float64)
+        hands = np.asarray(data['hand'], dtype=np.int64)
+        sameSession = np.zeros(len(data), dtype=bool)
+        sameSession[1:] = groups[1:] == groups[:-1]
+        dt = np.zeros(len(data), dtype=np.float64)
+        dt[:-1] = np.where(sameSession[1:], np.diff(times), 0.0)
+        dt = np.clip(dt, 0.0, maxGap)
+        previous = np.zeros(len(data), dtype=np.int64)
+        previous[1:] = np.where(sameSession[1:], hands[:-1], 0)
+        handEvents = np.maximum(hands - previous, 0)
+        below = rates < threshold
+        return data, groups, times, rates, dt, below, handEvents
+
+    def sessionSummary(self, threshold=ANALYTICS_THRESHOLD, maxGap=ANALYTICS_MAX_GAP):
+        def compute(data, groups, times, rates, dt, below, handEvents, n):
+            rows = np.bincount(groups, minlength=n)
+            duration = np.bincount(groups, weights=dt, minlength=n)
+            summary = np.zeros(n, dtype=SESSION_SUMMARY_DTYPE)
+            summary['session'] = np.arange(n)
+            summary['rows'] = rows
+            summary['duration'] = duration
+            with np.errstate(invalid='ignore', divide='ignore'):
+                summary['meanRate'] = np.bincount(groups, weights=rates, minlength=n) / rows
+                summary['meanPersons'] = np.bincount(groups, weights=data['faceCount'], minlength=n) / rows
+                summary['belowSeconds'] = np.bincount(groups, weights=dt * below, minlength=n)
+                summary['belowRatio'] = summary['belowSeconds'] / duration
+                summary['handEvents'] = np.bincount(groups, weights=handEvents, minlength=n)
+                summary['handPerMinute'] = summary['handEvents'] / (duration / 60)
+            for name, q in (('p10Rate', 0.1), ('p50Rate', 0.5), ('p90Rate', 0.9)):
+                summary[name] = groupPercentile(rates, groups, n, q)
+            return summary
+        return self._summarize('sessions', [threshold, maxGap], SESSION_SUMMARY_DTYPE, compute)
+
+    def bucketSummary(self, bucketSeconds=ANALYTICS_BUCKET_SECONDS, threshold=ANALYTICS_THRESHOLD,
+                      maxGap=ANALYTICS_MAX_GAP):
+        # 按会话内的时间段（例如每5分钟）聚合，便于比较课堂不同阶段
+        def compute(data, groups, times, rates, dt, below, handEvents, n):
+            if len(data) == 0:
+                return np.zeros(0, dtype=BUCKET_SUMMARY_DTYPE)
+            buckets = np.floor(times / bucketSeconds).astype(np.int64)
+            offset = int(buckets.min())
+            span = int(buckets.max()) - offset + 1
+            keys = groups * span + (buckets - offset)
+            uniqueKeys, inverse = np.unique(keys, return_inverse=True)
+            m = len(uniqueKeys)
+            rows = np.bincount(inverse, minlength=m)
+            duration = np.bincount(inverse, weights=dt, minlength=m)
+            summary = np.zeros(m, dtype=BUCKET_SUMMARY_DTYPE)
+            summary['session'] = uniqueKeys // span
+            summary['bucket'] = uniqueKeys % span + offset
+            summary['start'] = summary['bucket'] * bucketSeconds
+            summary['rows'] = rows
+            summary['meanRate'] = np.bincount(inverse, weights=rates, minlength=m) / rows
+            summary['minRate'] = groupPercentile(rates, inverse, m, 0.0)
+            summary['belowSeconds'] = np.bincount(inverse, weights=dt * below, minlength=m)
+            summary['handEvents'] = np.bincount(inverse, weights=handEvents, minlength=m)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                summary['handPerMinute'] = summary['handEvents'] / (duration / 60)
+            return summary
+        return self._summarize('buckets', [bucketSeconds, threshold, maxGap], BUCKET_SUMMARY_DTYPE, compute)
+
+    def toDataFrame(self, summary):
+        # 附加会话文件名、教室和开始时间，便于在 pandas 中进一步分析
+        import pandas as pd
+        table = pd.DataFrame(summary)
+        table.insert(1, 'file', [os.path.basename(self.sessions[i]['path']) for i in table['session']])
+        table.insert(2, 'room', [self.sessions[i]['room'] for i in table['session']])
+        table.insert(3, 'startTime', [self.sessions[i]['start'] for i in table['session']])
+        return table
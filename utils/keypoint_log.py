@@ -0,0 +1,136 @@
+import os
+import struct
+import threading
+from datetime import datetime
+import numpy as np
+from config import KEYPOINT_LOG_DIR, SESSION_FLUSH_ROWS
+
+# 索引文件头：魔数、关键点数、画面宽高
+HEADER_FORMAT = '<8siii'
+HEADER_MAGIC = b'KPTLOG01'
+HEADER_SIZE = 32
+
+# 每次推理一条索引记录，指向数据文件中该帧的第一个人
+FRAME_DTYPE = np.dtype([
+    ('frameIndex', '<i8'),
+    ('timestamp', '<f8'),
+    ('start', '<i8'),
+    ('count', '<i4'),
+])
+
+
+def personDtype(numKeypoints):
+    return np.dtype([
+        ('box', '<f4', (4,)),
+        ('conf', '<f4'),
+        ('keypoints', '<f4', (numKeypoints, 3)),
+    ])
+
+
+def logPaths(path):
+    base = os.path.splitext(path)[0]
+    return base + '.kpi', base + '.kpd'
+
+
+class KeypointLogWriter:
+    # 只追加的推理结果日志：索引文件（每帧一条）+ 数据文件（每人一条），均为定长记录
+    def __init__(self, path=None, frameSize=(0, 0), numKeypoints=17, flushRows=SESSION_FLUSH_ROWS):
+        if path is None:
+            path = os.path.join(KEYPOINT_LOG_DIR, f'keypoints_{datetime.now().strftime("%Y%m%d_%H%M%S")}.kpi')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.indexPath, self.dataPath = logPaths(path)
+        self.numKeypoints = numKeypoints
+        self.personDtype = personDtype(numKeypoints)
+        self.frameSize = frameSize
+        exists = os.path.exists(self.indexPath) and os.path.getsize(self.indexPath) >= HEADER_SIZE
+        self._indexFile = open(self.indexPath, 'ab')
+        self._dataFile = open(self.dataPath, 'ab')
+        if not exists:
+            self._indexFile.write(struct.pack(HEADER_FORMAT, HEADER_MAGIC, numKeypoints, *frameSize).ljust(HEADER_SIZE, b'\0'))
+        self._persons = os.path.getsize(self.dataPath) // self.personDtype.itemsize
+        self._frames = np.zeros(max(1, flushRows), dtype=FRAME_DTYPE)
+        self._pendingFrames = 0
+        self._pendingPersons = []
+        self._lock = threading.Lock()
+
+    def append(self, frameIndex, timestamp, boxes, confs, keypoints):
+        count = len(boxes)
+        records = np.zeros(count, dtype=self.personDtype)
+        if count:
+            records['box'] = boxes
+            records['conf'] = confs
+            k = min(self.numKeypoints, keypoints.shape[1])
+            records['keypoints'][:, :k] = keypoints[:, :k]
+        with self._lock:
+            self._frames[self._pendingFrames] = (frameIndex, timestamp, self._persons, count)
+            self._persons += count
+            self._pendingPersons.append(records)
+            self._pendingFrames += 1
+            if self._pendingFrames == len(self._frames):
+                self._flushLocked()
+
+    def flush(self):
+        with self._lock:
+            self._flushLocked()
+
+    def _flushLocked(self):
+        # 先写数据再写索引，中途退出时索引不会指向不存在的数据
+        if self._pendingFrames == 0 or self._indexFile is None:
+            return
+        for records in self._pendingPersons:
+            self._dataFile.write(records.tobytes())
+        self._dataFile.flush()
+        self._indexFile.write(self._frames[:self._pendingFrames].tobytes())
+        self._indexFile.flush()
+        self._pendingFrames = 0
+        self._pendingPersons = []
+
+    def close(self):
+        with self._lock:
+            self._flushLocked()
+            if self._indexFile is not None:
+                self._indexFile.close()
+                self._dataFile.close()
+                self._indexFile = None
+                self._dataFile = None
+
+
+class KeypointLogReader:
+    # 内存映射读取，返回的数组都是日志文件的视图
+    def __init__(self, path):
+        self.indexPath, self.dataPath = logPaths(path)
+        with open(self.indexPath, 'rb') as f:
+            magic, numKeypoints, width, height = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+        if magic != HEADER_MAGIC:
+            raise ValueError(f"Not a keypoint log: {self.indexPath}")
+        self.numKeypoints = numKeypoints
+        self.frameSize = (width, height)
+        self.personDtype = personDtype(numKeypoints)
+        frameCount = (os.path.getsize(self.indexPath) - HEADER_SIZE) // FRAME_DTYPE.itemsize
+        personCount = os.path.getsize(self.dataPath) // self.personDtype.itemsize
+        self.frames = (np.memmap(self.indexPath, dtype=FRAME_DTYPE, mode='r', offset=HEADER_SIZE, shape=(frameCount,))
+                       if frameCount else np.zeros(0, dtype=FRAME_DTYPE))
+        self.persons = (np.memmap(self.dataPath, dtype=self.personDtype, mode='r', shape=(personCount,))
+                        if personCount else np.zeros(0, dtype=self.personDtype))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame(self, i):
+        # 返回 (帧号, 时间戳, 检测框, 置信度, 关键点)
+        entry = self.frames[i]
+        records = self.persons[entry['start']:entry['start'] + entry['count']]
+        return int(entry['frameIndex']), float(entry['timestamp']), records['box'], records['conf'], records['keypoints']
+
+    def iterFrames(self, start=0, stop=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        for i in range(start, stop):
+            yield self.frame(i)
+
+    def toNpz(self, path):
+        # 导出为 evaluate_postures.py 可读取的 .npz（真值字段需另行标注）
+        np.savez_compressed(path, keypoints=self.persons['keypoints'], boxes=self.persons['box'],
+                            confs=self.persons['conf'],
+                            frame=np.repeat(self.frames['frameIndex'], self.frames['count']))
@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+
+
+class LatestFrameGrabber:
+    # 采集线程：只保留最新一帧，未被取走就被覆盖的帧计为丢帧
+    # frameInterval > 0 表示视频文件：按原始帧率读取，读到结尾后结束，而不是全速解码后丢弃
+    def __init__(self, cap, frameInterval=0.0):
+        self.cap = cap
+        self.frameInterval = frameInterval
+        self.finished = False
+        self.cond = threading.Condition()
+        self.frame = None
+        self.timestamp = 0.0
+        self.seq = 0
+        self.captured = 0
+        self.dropped = 0
+        self.failed = 0
+        self._consumedSeq = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name='capture', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        with self.cond:
+            self.cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def _loop(self):
+        nextTime = time.monotonic()
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                if self.frameInterval > 0:
+                    with self.cond:
+                        self.finished = True
+                        self.cond.notify_all()
+                    return
+                self.failed += 1
+                time.sleep(0.01)
+                continue
+            with self.cond:
+                if self.seq > self._consumedSeq:
+                    self.dropped += 1
+                self.frame = frame
+                self.timestamp = time.time()
+                self.seq += 1
+                self.captured += 1
+                self.cond.notify()
+            if self.frameInterval > 0:
+                # 解码跟不上时不累积欠下的等待时间
+                nextTime += self.frameInterval
+                delay = nextTime - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    nextTime = time.monotonic()
+
+    @property
+    def exhausted(self):
+        # 视频文件已读完且最后一帧已被取走
+        with self.cond:
+            return self.finished and self.seq <= self._consumedSeq
+
+    def read(self, timeout=0.5):
+        # 阻塞等待比上次取走的更新的帧
+        with self.cond:
+            if self.seq <= self._consumedSeq and not self.finished:
+                self.cond.wait(timeout)
+            if self.seq <= self._consumedSeq:
+                return None, None
+            self._consumedSeq = self.seq
+            return self.frame, self.timestamp
+
+
+class DetectionPipeline:
+    # 采集 -> 推理 -> 渲染 三级流水线，推理在工作线程中完成，Tk线程只负责绘制
+    def __init__(self, cap, processFn, maxQueue=2):
+        self.grabber = LatestFrameGrabber(cap)
+        self.processFn = processFn
+        self.outQueue = queue.Queue(maxsize=maxQueue)
+        self.processed = 0
+        self.errors = 0
+        self.queueDropped = 0
+        self.renderDropped = 0
+        self.lastProcessTime = 0.0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self.grabber.start()
+        self._thread = threading.Thread(target=self._loop, name='inference', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self.grabber.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def _loop(self):
+        while self._running:
+            frame, timestamp = self.grabber.read()
+            if frame is None:
+                continue
+            start = time.perf_counter()
+            try:
+                output = self.processFn(frame, timestamp)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error processing frame: {e}")
+                continue
+            self.lastProcessTime = time.perf_counter() - start
+            self.processed += 1
+            self._put(output)
+
+    def _put(self, output):
+        # 队列满时丢弃最旧的结果，而不是阻塞推理线程
+        while True:
+            try:
+                self.outQueue.put_nowait(output)
+                return
+            except queue.Full:
+                try:
+                    self.outQueue.get_nowait()
+                    self.queueDropped += 1
+                except queue.Empty:
+                    pass
+
+    def poll(self):
+        # 由Tk线程调用：取出最新结果，过时的结果直接丢弃
+        latest = None
+        while True:
+            try:
+                output = self.outQueue.get_nowait()
+            except queue.Empty:
+                break
+            if latest is not None:
+                self.renderDropped += 1
+            latest = output
+        return latest
+
+    def getStats(self):
+        return {
+            'capture': {
+                'captured': self.grabber.captured,
+                'dropped': self.grabber.dropped,
+                'failed': self.grabber.failed,
+            },
+            'inference': {
+                'processed': self.processed,
+                'errors': self.errors,
+                'lastMs': self.lastProcessTime * 1000,
+            },
+            'render': {
+                'queueDepth': self.outQueue.qsize(),
+                'queueDropped': self.queueDropped,
+                'renderDropped': self.renderDropped,
+            },
+        }
+
+    def describeStats(self):
+        stats = self.getStats()
+        return (f"采集丢帧：{stats['capture']['dropped']}  "
+                f"推理耗时：{stats['inference']['lastMs']:.0f}ms  "
+                f"渲染队列：{stats['render']['queueDepth']}  "
+                f"渲染丢帧：{stats['render']['queueDropped'] + stats['render']['renderDropped']}")
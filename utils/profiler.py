@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+import cv2
+import numpy as np
+from config import PROFILE_ENABLED, PROFILE_WINDOW
+
+_NULL_STAGE = nullcontext()
+
+
+class _StageTimer:
+    __slots__ = ('profiler', 'name', 'began')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.began = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, (time.perf_counter() - self.began) * 1000)
+        return False
+
+
+class StageProfiler:
+    # 热路径各阶段计时：每个阶段保存最近若干次耗时（毫秒）的环形缓冲区，读取时才计算分位数
+    def __init__(self, enabled=PROFILE_ENABLED, window=PROFILE_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.totals = {}
+        self.counters = {}
+        self.startTime = time.time()
+
+    def stage(self, name):
+        # 关闭时返回共享的空上下文，几乎没有额外开销
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageTimer(self, name)
+
+    def record(self, name, ms):
+        if not self.enabled:
+            return
+        with self.lock:
+            buffer = self.samples.get(name)
+            if buffer is None:
+                buffer = self.samples[name] = np.zeros(self.window, dtype=np.float64)
+                self.totals[name] = 0
+            total = self.totals[name]
+            buffer[total % self.window] = ms
+            self.totals[name] = total + 1
+
+    def recordSpeed(self, speed, prefix='model.'):
+        # ultralytics 结果中的 speed：{'preprocess': ms, 'inference': ms, 'postprocess': ms}
+        if not self.enabled or not speed:
+            return
+        for name, ms in speed.items():
+            if ms is not None:
+                self.record(prefix + name, ms)
+
+    def setCounters(self, **counters):
+        # 丢帧等累计计数由各自的模块维护，这里只保存最新值用于显示和记录
+        if self.enabled:
+            self.counters.update(counters)
+
+    def summary(self):
+        stages = {}
+        with self.lock:
+            items = [(name, buffer[:min(self.totals[name], self.window)].copy(), self.totals[name])
+                     for name, buffer in self.samples.items()]
+        for name, values, count in items:
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            stages[name] = {'count': count, 'meanMs': float(values.mean()), 'p50Ms': float(p50),
+                            'p90Ms': float(p90), 'p99Ms': float(p99), 'maxMs': float(values.max())}
+        return {'uptime': time.time() - self.startTime, 'stages': stages, 'counters': dict(self.counters)}
+
+    def describeLines(self):
+        summary = self.summary()
+        lines = [f"{name:<16} p50 {s['p50Ms']:6.1f}ms  p90 {s['p90Ms']:6.1f}ms  p99 {s['p99Ms']:6.1f}ms"
+                 for name, s in summary['stages'].items()]
+        if summary['counters']:
+            lines.append('  '.join(f"{name}={value}" for name, value in summary['counters'].items()))
+        return lines
+
+    def describe(self):
+        return '\n'.join(self.describeLines())
+
+    def drawOverlay(self, img, origin=(8, 20), lineHeight=18):
+        # 在画面左上角绘制半透明背景和各阶段耗时（cv2.putText 不支持中文，只用英文）
+        if not self.enabled:
+            return img
+        lines = self.describeLines()
+        if not lines:
+            return img
+        x, y = origin
+        height = lineHeight * len(lines) + 8
+        width = min(img.shape[1] - x, 470)
+        region = img[y - 16:y - 16 + height, x - 4:x - 4 + width]
+        region //= 2
+        for i, line in enumerate(lines):
+            cv2.putText(img, line, (x, y + i * lineHeight), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1, cv2.LINE_AA)
+        return img
+
+    def dump(self, path):
+        # 追加一行JSON，便于之后对比同一教室不同时段的性能
+        if not self.enabled:
+            return
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            record = dict(self.summary(), time=time.strftime('%Y-%m-%d %H:%M:%S'))
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"Error writing profile log: {e}")
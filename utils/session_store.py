@@ -0,0 +1,101 @@
+import os
+import threading
+from datetime import datetime
+import numpy as np
+from config import SESSION_DIR, SESSION_FLUSH_ROWS
+
+# 每帧记录一行完整的指标向量
+SESSION_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('rate', '<f4'),
+    ('faceCount', '<i4'),
+    ('headUp', '<i4'),
+    ('headDown', '<i4'),
+    ('lying', '<i4'),
+    ('hand', '<i4'),
+    ('total', '<i4'),
+])
+
+class SessionStore:
+    # 只追加的会话指标存储：定长记录写入磁盘文件，读取时内存映射，内存占用与会话时长无关
+    def __init__(self, path=None, name=None, flushRows=SESSION_FLUSH_ROWS):
+        if path is None:
+            suffix = f'{name}_' if name else ''
+            path = os.path.join(SESSION_DIR, f'session_{suffix}{datetime.now().strftime("%Y%m%d_%H%M%S")}.bin')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, 'ab')
+        self._buffer = np.zeros(max(1, flushRows), dtype=SESSION_DTYPE)
+        self._pending = 0
+        self._flushed = os.path.getsize(path) // SESSION_DTYPE.itemsize
+        self._mapped = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._flushed + self._pending
+
+    def append(self, timePoint, rate, faceCount, headUp, headDown, lying, hand, total):
+        with self._lock:
+            self._buffer[self._pending] = (timePoint, rate, faceCount, headUp, headDown, lying, hand, total)
+            self._pending += 1
+            if self._pending == len(self._buffer):
+                self._flushLocked()
+
+    def flush(self):
+        with self._lock:
+            self._flushLocked()
+
+    def _flushLocked(self):
+        if self._pending == 0 or self._file is None:
+            return
+        self._file.write(self._buffer[:self._pending].tobytes())
+        self._file.flush()
+        self._flushed += self._pending
+        self._pending = 0
+
+    def view(self):
+        # 返回覆盖全部已记录数据的只读内存映射
+        with self._lock:
+            self._flushLocked()
+            count = self._flushed
+            if count == 0:
+                return np.zeros(0, dtype=SESSION_DTYPE)
+            if self._mapped is None or len(self._mapped) != count:
+                self._mapped = np.memmap(self.path, dtype=SESSION_DTYPE, mode='r', shape=(count,))
+            return self._mapped
+
+    def query(self, startTime=None, endTime=None):
+        # 时间列单调递增，二分查找只会读取少量页面
+        data = self.view()
+        times = data['time']
+        start = 0 if startTime is None else int(np.searchsorted(times, startTime, side='left'))
+        stop = len(data) if endTime is None else int(np.searchsorted(times, endTime, side='right'))
+        return data[start:stop]
+
+    def downsample(self, maxPoints, startTime=None, endTime=None):
+        # 按等长区间取平均，用于图表显示，返回 (时间, 抬头率)
+        data = self.query(startTime, endTime)
+        n = len(data)
+        if n <= maxPoints:
+            return np.asarray(data['time'], dtype=np.float64), np.asarray(data['rate'], dtype=np.float64)
+        edges = np.linspace(0, n, maxPoints + 1).astype(np.int64)[:-1]
+        sizes = np.diff(np.append(edges, n))
+        times = np.add.reduceat(np.asarray(data['time'], dtype=np.float64), edges) / sizes
+        rates = np.add.reduceat(np.asarray(data['rate'], dtype=np.float64), edges) / sizes
+        return times, rates
+
+    def iterChunks(self, chunkRows=65536, start=0, stop=None):
+        # 分块读取，导出时不需要把整个会话载入内存
+        data = self.view()
+        stop = len(data) if stop is None else min(stop, len(data))
+        for offset in range(start, stop, chunkRows):
+            yield data[offset:min(offset + chunkRows, stop)]
+
+    def close(self):
+        with self._lock:
+            self._flushLocked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,398 @@
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+import cv2
+
+from config import WEB_HOST, WEB_PORT, WEB_PUSH_INTERVAL, WEB_CLIENT_TIMEOUT, MJPEG_QUALITY, MJPEG_MAX_FPS
+from detection.posture import ACTION_NAMES
+
+DEFAULT_CHANNEL = 'default'
+WS_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC11B6F'
+WS_TEXT, WS_CLOSE, WS_PING, WS_PONG = 0x1, 0x8, 0x9, 0xA
+
+INDEX_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>智瞳课堂 实时监测</title>
+<style>body{font-family:sans-serif;background:#f4f6fa}div.view{display:inline-block;margin:8px;vertical-align:top}
+img{max-width:640px;display:block}pre{font-size:12px}</style></head>
+<body><div id="views"></div><script>
+const views = document.getElementById('views');
+function connect() {
+  const ws = new WebSocket(`ws://${location.host}/ws`);
+  ws.onmessage = (event) => {
+    for (const [name, metrics] of Object.entries(JSON.parse(event.data))) {
+      let view = document.getElementById('view-' + name);
+      if (!view) {
+        view = document.createElement('div');
+        view.className = 'view';
+        view.id = 'view-' + name;
+        const title = document.createElement('h3');
+        title.textContent = name;
+        const img = document.createElement('img');
+        img.src = '/stream/' + encodeURIComponent(name);
+        view.append(title, img, document.createElement('pre'));
+        views.appendChild(view);
+      }
+      view.querySelector('pre').textContent = JSON.stringify(metrics, null, 2);
+    }
+  };
+  ws.onclose = () => setTimeout(connect, 2000);
+}
+connect();
+</script></body></html>
+"""
+
+
+def buildMetrics(timestamp, total, personCount, actionCounts, rates, snapshots=None):
+    # 推送给网页的数值指标；各时间窗口给出平均人数和各动作占设定总人数的平均比例
+    headUpRate, handUpRate, headDownLyingRate = rates
+    metrics = {
+        'timestamp': timestamp,
+        'total': total,
+        'personCount': personCount,
+        'actionCounts': dict(actionCounts),
+        'headUpRate': headUpRate,
+        'handUpRate': handUpRate,
+        'headDownLyingRate': headDownLyingRate,
+    }
+    if snapshots:
+        metrics['windows'] = {
+            name: {
+                'frames': snapshot.frames,
+                'seconds': snapshot.seconds,
+                'meanPersons': snapshot.meanPersons,
+                'meanConfidence': snapshot.meanConfidence,
+                'actionRates': {action: (float(mean) / total * 100 if total > 0 else 0.0)
+                                for action, mean in zip(ACTION_NAMES, snapshot.meanActions)},
+            }
+            for name, snapshot in snapshots.items()
+        }
+    return metrics
+
+
+def encodeJpeg(frame):
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, MJPEG_QUALITY])
+    return buffer.tobytes() if ok else None
+
+
+def wsFrame(payload, opcode=WS_TEXT):
+    # 服务端发出的帧不加掩码
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def _jsonDefault(value):
+    # numpy 标量和数组
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def _response(status, contentType, body):
+    return (f"HTTP/1.1 {status}\r\nContent-Type: {contentType}\r\nContent-Length: {len(body)}\r\n"
+            f"Cache-Control: no-cache\r\nConnection: close\r\n\r\n").encode('latin-1') + body
+
+
+class Channel:
+    # 一路画面和指标：生产者只交接最新一帧，JPEG在服务线程中按需编码一次，所有观看者共享
+    def __init__(self, name):
+        self.name = name
+        self.metrics = None
+        self.metricsVersion = 0
+        self.frame = None
+        self.frameSeq = 0
+        self.lastFrameTime = 0.0
+        self.jpeg = None
+        self.jpegSeq = 0
+        self.encoding = None
+        self.viewers = 0
+        self.encoded = 0
+        self.dropped = 0  # 慢客户端跳过的帧数（所有观看者合计）
+
+
+class WebServer:
+    # 独立线程中运行的 asyncio 服务：/metrics 返回JSON，/ws 推送指标，/stream 输出MJPEG画面
+    def __init__(self, host=WEB_HOST, port=WEB_PORT):
+        self.host = host
+        self.port = port
+        self.channels = {}
+        self.clients = 0
+        self.slowDisconnects = 0
+        self._lock = threading.Lock()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._event = None
+        self._encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mjpeg')
+        self._metricsCache = (None, None)
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name='web-server', daemon=True)
+        self._thread.start()
+        ready.wait(5.0)
+
+    def stop(self):
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._encoder.shutdown(wait=False)
+
+    def _run(self, ready):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        except OSError as e:
+            print(f"Error starting web server: {e}")
+            loop.close()
+            ready.set()
+            return
+        self._event = asyncio.Event()
+        self._loop = loop
+        print(f"✅ 网页监测服务已启动：http://{self.host}:{self.port}/")
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._loop = None
+            self._server.close()
+            tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(self._server.wait_closed())
+            loop.close()
+
+    def channel(self, name):
+        # 只由生产者（publish）创建频道；客户端请求只能查找已有频道，不能随意新建
+        with self._lock:
+            channel = self.channels.get(name)
+            if channel is None:
+                channel = self.channels[name] = Channel(name)
+            return channel
+
+    def _findChannel(self, name):
+        with self._lock:
+            return self.channels.get(name)
+
+    def wantsFrames(self, name=DEFAULT_CHANNEL):
+        channel = self.channels.get(name)
+        return channel is not None and channel.viewers > 0
+
+    def publish(self, name=DEFAULT_CHANNEL, metrics=None, frame=None, rgb=False):
+        # 可在任意线程中调用；没有人观看画面时不拷贝也不编码，超过最大帧率的帧直接丢弃
+        loop = self._loop
+        if loop is None:
+            return
+        channel = self.channel(name)
+        changed = False
+        with self._lock:
+            if metrics is not None:
+                channel.metrics = metrics
+                channel.metricsVersion += 1
+                changed = True
+            if frame is not None and channel.viewers > 0:
+                now = time.monotonic()
+                if now - channel.lastFrameTime >= 1.0 / MJPEG_MAX_FPS:
+                    # 生产者的缓冲区会被复用，交接前复制（RGB/RGBX画面顺便转换为BGR）
+                    if rgb:
+                        code = cv2.COLOR_RGBA2BGR if frame.shape[2] == 4 else cv2.COLOR_RGB2BGR
+                        channel.frame = cv2.cvtColor(frame, code)
+                    else:
+                        channel.frame = frame.copy()
+                    channel.frameSeq += 1
+                    channel.lastFrameTime = now
+                    changed = True
+        if changed:
+            try:
+                loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                pass
+
+    def _wake(self):
+        # 换上新的事件再触发旧事件，所有等待中的客户端都会醒来检查自己关心的数据
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    def getStats(self):
+        with self._lock:
+            channels = {name: {'viewers': c.viewers, 'published': c.frameSeq, 'encoded': c.encoded,
+                               'dropped': c.dropped, 'metricsVersion': c.metricsVersion}
+                        for name, c in self.channels.items()}
+        return {'clients': self.clients, 'slowDisconnects': self.slowDisconnects, 'channels': channels}
+
+    def _metricsPayload(self, name=None):
+        # 同一版本的指标只序列化一次，所有WebSocket客户端共享同一份已组帧的数据
+        with self._lock:
+            if name is None:
+                channels = [c for c in self.channels.values() if c.metrics is not None]
+            else:
+                channel = self.channels.get(name)
+                channels = [channel] if channel is not None and channel.metrics is not None else []
+            key = (name, tuple((c.name, c.metricsVersion) for c in channels))
+            if self._metricsCache[0] == key:
+                return key, self._metricsCache[1]
+            body = json.dumps({c.name: c.metrics for c in channels}, ensure_ascii=False,
+                              default=_jsonDefault).encode('utf-8')
+            self._metricsCache = (key, body)
+            return key, body
+
+    async def _encode(self, channel):
+        # 第一个发现新帧的客户端发起编码，其他客户端等待同一个结果
+        if channel.encoding is None:
+            with self._lock:
+                frame, seq = channel.frame, channel.frameSeq
+            if seq == channel.jpegSeq or frame is None:
+                return
+            channel.encoding = self._loop.run_in_executor(self._encoder, encodeJpeg, frame)
+            try:
+                jpeg = await asyncio.shield(channel.encoding)
+                if jpeg is not None:
+                    channel.jpeg = jpeg
+                    channel.encoded += 1
+                channel.jpegSeq = seq
+            finally:
+                channel.encoding = None
+        else:
+            await asyncio.shield(channel.encoding)
+
+    async def _drain(self, writer):
+        try:
+            await asyncio.wait_for(writer.drain(), WEB_CLIENT_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.slowDisconnects += 1
+            raise
+
+    async def _handle(self, reader, writer):
+        self.clients += 1
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), WEB_CLIENT_TIMEOUT)
+            lines = request.decode('latin-1').split('\r\n')
+            method, target, _ = lines[0].split(' ', 2)
+            headers = {}
+            for line in lines[1:]:
+                key, _, value = line.partition(':')
+                headers[key.strip().lower()] = value.strip()
+            parts = [unquote(part) for part in urlsplit(target).path.strip('/').split('/') if part]
+            route = parts[0] if parts else ''
+            name = parts[1] if len(parts) > 1 else None
+            if method != 'GET':
+                writer.write(_response('405 Method Not Allowed', 'text/plain', b'Method Not Allowed'))
+            elif route == '':
+                writer.write(_response('200 OK', 'text/html; charset=utf-8', INDEX_HTML.encode('utf-8')))
+            elif route == 'metrics':
+                writer.write(_response('200 OK', 'application/json', self._metricsPayload(name)[1]))
+            elif route == 'stats':
+                writer.write(_response('200 OK', 'application/json', json.dumps(self.getStats()).encode('utf-8')))
+            elif route == 'stream':
+                channel = self._findChannel(name or DEFAULT_CHANNEL)
+                if channel is None:
+                    writer.write(_response('404 Not Found', 'text/plain', b'Unknown stream'))
+                else:
+                    await self._serveMjpeg(writer, channel)
+            elif route == 'ws' and headers.get('upgrade', '').lower() == 'websocket':
+                await self._serveWebSocket(reader, writer, headers, name)
+            else:
+                writer.write(_response('404 Not Found', 'text/plain', b'Not Found'))
+            await self._drain(writer)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # 服务停止时取消所有连接
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def _serveMjpeg(self, writer, channel):
+        # 每个观看者只记录自己发到了第几帧；drain 等待期间到达的帧被跳过，恢复后直接发送最新一帧
+        writer.transport.set_write_buffer_limits(high=0)
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary=frame\r\n'
+                     b'Cache-Control: no-cache\r\nConnection: close\r\n\r\n')
+        with self._lock:
+            channel.viewers += 1
+        sentSeq = 0
+        try:
+            while True:
+                event = self._event
+                if channel.frameSeq != channel.jpegSeq:
+                    await self._encode(channel)
+                if channel.jpeg is not None and channel.jpegSeq != sentSeq:
+                    if sentSeq:
+                        channel.dropped += channel.jpegSeq - sentSeq - 1
+                    sentSeq = channel.jpegSeq
+                    jpeg = channel.jpeg
+                    writer.write(b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n' % len(jpeg))
+                    writer.write(jpeg)
+                    writer.write(b'\r\n')
+                    await self._drain(writer)
+                    continue
+                await event.wait()
+        finally:
+            with self._lock:
+                channel.viewers -= 1
+
+    async def _serveWebSocket(self, reader, writer, headers, name):
+        key = headers.get('sec-websocket-key', '').encode('latin-1')
+        accept = base64.b64encode(hashlib.sha1(key + WS_GUID).digest()).decode('latin-1')
+        writer.transport.set_write_buffer_limits(high=0)
+        writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                      f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode('latin-1'))
+        receiver = asyncio.ensure_future(self._receiveWebSocket(reader, writer))
+        sentKey = None
+        try:
+            while not receiver.done():
+                event = self._event
+                key, body = self._metricsPayload(name)
+                if key != sentKey:
+                    # 慢客户端只会在 drain 处等待，期间的多次更新合并为最新的一条
+                    writer.write(wsFrame(body))
+                    await self._drain(writer)
+                    sentKey = key
+                    await asyncio.sleep(WEB_PUSH_INTERVAL)
+                    continue
+                waiter = asyncio.ensure_future(event.wait())
+                await asyncio.wait({receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+        finally:
+            receiver.cancel()
+
+    async def _receiveWebSocket(self, reader, writer):
+        # 只处理 ping 和 close，客户端发来的其他消息忽略
+        try:
+            while True:
+                head = await reader.readexactly(2)
+                opcode, masked, length = head[0] & 0x0F, head[1] & 0x80, head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack('!H', await reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack('!Q', await reader.readexactly(8))[0]
+                if length > 65536:
+                    return
+                mask = await reader.readexactly(4) if masked else None
+                data = await reader.readexactly(length)
+                if mask:
+                    data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+                if opcode == WS_CLOSE:
+                    writer.write(wsFrame(b'', WS_CLOSE))
+                    return
+                if opcode == WS_PING:
+                    writer.write(wsFrame(data, WS_PONG))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return